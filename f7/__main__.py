@@ -18,6 +18,21 @@ def _import_register_os():
     return register_os
 
 
+def _print_import_report():
+    """Prints how long each lazily imported name of the python evaluator takes to import."""
+    from .plugins.python_eval_plugin.lazy import eager, import_report
+
+    report = import_report()
+    total = sum(cost for _, _, cost in report)
+    print(f"{'name':<22} {'module':<16} {'ms':>8}")
+    for name, module, cost in report:
+        print(f"{name:<22} {module:<16} {cost * 1000:>8.2f}")
+    print(f"{'total':<39} {total * 1000:>8.2f}")
+    if eager:
+        print("not lazy (already imported when the helpers were defined):")
+        print(", ".join(f"{name} ({module})" for name, module in sorted(eager.items())))
+
+
 def cli(argv: list):
     # TODO: Implement logging to a file for better error tracking in production.
     # This will help capture errors that might occur when the GUI isn't available.
@@ -33,8 +48,8 @@ def cli(argv: list):
     parser.add_argument(
         "action",
         nargs="?",
-        choices=["show", "settings", "register", "unregister"],
-        help="Specify an action to perform on startup. 'show' displays the main window. 'settings' opens the settings dialog. 'register' integrates the application with the operating system. 'unregister' reverse 'register'.",
+        choices=["show", "settings", "register", "unregister", "import-report"],
+        help="Specify an action to perform on startup. 'show' displays the main window. 'settings' opens the settings dialog. 'register' integrates the application with the operating system. 'unregister' reverse 'register'. 'import-report' prints the import cost of the lazily loaded python names.",
     )
 
     args = parser.parse_args(argv[1:])
@@ -45,6 +60,10 @@ def cli(argv: list):
         register_os(unregister)
         sys.exit(0)
 
+    if args.action == "import-report":
+        _print_import_report()
+        sys.exit(0)
+
     # --- Single Instance Check ---
     # Attempt to send a "show" command to an existing instance.
     # If successful, another instance is running and has been activated.
@@ -1,10 +1,11 @@
 # api.py
 from __future__ import annotations
 
+import os
 from typing import TYPE_CHECKING, List, Optional
 
-from PyQt6.QtCore import QStringListModel, QTimer
-from PyQt6.QtGui import QGuiApplication
+from PyQt6.QtCore import QMimeData, QStringListModel, QTimer, QUrl
+from PyQt6.QtGui import QGuiApplication, QTextCursor
 from PyQt6.QtWidgets import QCompleter, QLabel, QTextEdit
 
 if TYPE_CHECKING:
@@ -23,6 +24,12 @@ class API:
         Initializes the API with a reference to the main window.
         """
         self._window = window_instance
+        # append_preview_content batches its deltas, flushed at most once per frame
+        self._pending_appends: List[str] = []
+        self._append_timer = QTimer()
+        self._append_timer.setSingleShot(True)
+        self._append_timer.setInterval(16)
+        self._append_timer.timeout.connect(self._flush_preview_appends)
 
     def _adjust_window_height(self) -> None:
         """
@@ -112,6 +119,9 @@ class API:
             content: The text or HTML content to display.
             is_html: Set to True if the content is HTML.
         """
+        # deltas appended before this call are replaced too
+        self._pending_appends.clear()
+        self._append_timer.stop()
         if is_html:
             self._window.preview_output.setHtml(content)
         else:
@@ -131,6 +141,34 @@ class API:
 
         self._adjust_window_height()  # Adjust height after content change and visibility change
 
+    def append_preview_content(self, delta: str) -> None:
+        """
+        Appends plain text to the end of the preview, for streamed output.
+        Deltas are batched and written at most once per frame (~16 ms), without re-rendering
+        what is already shown. `update_preview_content` replaces everything, including pending deltas.
+
+        Args:
+            delta: The text to append.
+        """
+        if not delta:
+            return
+        self._pending_appends.append(delta)
+        if not self._append_timer.isActive():
+            self._append_timer.start()
+
+    def _flush_preview_appends(self) -> None:
+        text = "".join(self._pending_appends)
+        self._pending_appends.clear()
+        if not text:
+            return
+        preview = self._window.preview_output
+        cursor = QTextCursor(preview.document())
+        cursor.movePosition(QTextCursor.MoveOperation.End)
+        cursor.insertText(text)
+        if preview.isHidden() and preview.toPlainText().strip():
+            preview.show()
+        self._adjust_window_height()
+
     def close(self, copy_and_close_text: Optional[str] = None) -> None:
         """
         Closes/hides the F7 window.
@@ -139,9 +177,15 @@ class API:
 
         do not use after error message.
 
+        If the command was run with Shift+Enter (chaining), the text becomes
+        the new working selection instead, and the window stays open.
+
         Args:
             copy_and_close_text: Optional text to copy to clipboard before closing.
         """
+        if copy_and_close_text is not None and self._window._chain_pending:
+            self._window._push_session_result(copy_and_close_text)
+            return
         if copy_and_close_text is not None:
             self.copy_text_to_clipboard(copy_and_close_text)
             result_preview = str(copy_and_close_text).replace("\n", " ").strip()[:50]
@@ -151,6 +195,49 @@ class API:
         else:
             self._window.close_window()
 
+    def close_with_file(self, path: str, clipboard_max_bytes: int) -> None:
+        """
+        Like `close(copy_and_close_text=...)`, for a result stored in a file.
+        The bytes go to the clipboard as they are, without decoding them into a string.
+        If the file is larger than `clipboard_max_bytes`, it is kept, and a reference to it
+        is copied instead (its path as text, and its URL for file managers).
+
+        Args:
+            path: The result file. It is deleted once its content was copied.
+            clipboard_max_bytes: The largest result copied to the clipboard.
+        """
+        size = os.path.getsize(path)
+        if self._window._chain_pending:
+            with open(path, "rb") as f:
+                text = f.read().decode("utf-8", errors="replace")
+            os.unlink(path)
+            self._window._push_session_result(text)
+            return
+
+        clipboard = QGuiApplication.clipboard()
+        if not clipboard:
+            self.set_status("Error: Could not access clipboard.")
+            return
+        mime = QMimeData()
+        if size <= clipboard_max_bytes:
+            with open(path, "rb") as f:
+                mime.setData("text/plain", f.read())
+            os.unlink(path)
+            if size < 1024 * 1024:
+                self.set_status(f"📋 Copied {size / 1024:.1f} KB")
+            else:
+                self.set_status(f"📋 Copied {size / 1024 / 1024:.1f} MB")
+            delay = 250
+        else:
+            mime.setText(path)
+            mime.setUrls([QUrl.fromLocalFile(path)])
+            self.set_status(
+                f"📁 Too large for the clipboard ({size / 1024 / 1024:.0f} MB), copied its path: {path}"
+            )
+            delay = 1500  # time to read the path
+        clipboard.setMimeData(mime)
+        QTimer.singleShot(delay, self._window.close_window)
+
     def forcequit_application(self) -> None:
         """
         Quits the entire F7 application.
@@ -1,5 +1,6 @@
 import os
 import sys
+import time
 import traceback
 from typing import Optional
 
@@ -9,6 +10,7 @@ from .api import API
 from .clip import get_selected_text
 from .plugins import plugins as plugins_registry
 from .plugins.base_plugin import PluginInterface
+from .session import SelectionSession
 from .settings import Color, HotKeyType, Settings
 
 
@@ -32,6 +34,7 @@ class CoreLogic:
         self.current_history_index = 0  # Index for navigating history
         self.ignore_text_changed_for_history = False
         self.default_plugin: Optional[PluginInterface] = None
+        self.session = SelectionSession()  # chained transformations (Shift+Enter)
 
     def register_main_settings(self):
         # In Qt’s QSS you can use 8‑digit hex in the #AARRGGBB format, where the first two hex digits are the alpha channel.
@@ -106,6 +109,12 @@ class CoreLogic:
         system_section.add("rememberLast", "Remember the last command", False, bool)
         system_section.add("history", "Enable command history", True, bool)
         system_section.add("history_limit", "Max number of history items", 100, int)
+        system_section.add(
+            "session_memory_mb",
+            "Memory limit (MB) for chained results (Shift+Enter, Alt+Left/Right to step)",
+            32,
+            int,
+        )
         system_section.add(
             "hotkey",
             "the keyboard shortcut to start the app from tray in windows/macos",
@@ -128,9 +137,10 @@ class CoreLogic:
             api_instance: The API instance for plugins to use.
             app_settings: The main application settings object.
         """
-        # TODO: write a list of each plugin and its startup speed.
         loaded_plugins_temp = []
+        startup_times = []
         for plugin_class in plugins_registry:
+            start = time.perf_counter()
             try:
                 # Pass the api_instance and the global settings object to the plugin
                 plugin_instance = plugin_class(api_instance, app_settings)
@@ -144,6 +154,9 @@ class CoreLogic:
                     )  # Pass the main settings manager
 
                 loaded_plugins_temp.append(plugin_instance)
+                startup_times.append(
+                    f"{plugin_instance.NAME} {(time.perf_counter() - start) * 1000:.1f}ms"
+                )
             except Exception as e:
                 print(
                     f"Core: Failed to load or initialize plugin {getattr(plugin_class, 'NAME', plugin_class.__name__)}: {e}",
@@ -151,6 +164,8 @@ class CoreLogic:
                 )
                 traceback.print_exc()
 
+        print(f"Core: Plugin startup times: {', '.join(startup_times)}", file=sys.stderr)
+
         # Sort plugins: Prefix/Suffix matching first, then by priority (lower first), then default
         loaded_plugins_temp.sort(
             key=lambda p: (not (p.PREFIX or p.SUFFIX), p.PRIORITY, not p.IS_DEFAULT)
@@ -254,6 +269,28 @@ class CoreLogic:
 
         return self.default_plugin  # Fallback to default if no specific match
 
+    def notify_startup(self):
+        for plugin in self.plugins:
+            try:
+                plugin.on_startup()
+            except Exception as e:
+                print(
+                    f"Core: Error in on_startup of plugin {getattr(plugin, 'NAME', 'UnknownPlugin')}: {e}",
+                    file=sys.stderr,
+                )
+                traceback.print_exc()
+
+    def notify_window_shown(self):
+        for plugin in self.plugins:
+            try:
+                plugin.on_window_show()
+            except Exception as e:
+                print(
+                    f"Core: Error in on_window_show of plugin {getattr(plugin, 'NAME', 'UnknownPlugin')}: {e}",
+                    file=sys.stderr,
+                )
+                traceback.print_exc()
+
     def cleanup_plugins(self):
         for plugin in self.plugins:
             try:
@@ -267,6 +304,11 @@ class CoreLogic:
                 traceback.print_exc()
         self.plugins = []  # Clear the list of plugins
 
+    def start_session(self, text: str):
+        """Start a new chaining session with the OS-selected text as the first step."""
+        self.session.max_bytes = self.settings.system.session_memory_mb * 1024 * 1024
+        self.session.reset(text)
+
     def get_os_selected_text(self) -> str:
         try:
             return get_selected_text()
@@ -0,0 +1 @@
+from .ai_ollama_plugin import AiOllamaPlugin
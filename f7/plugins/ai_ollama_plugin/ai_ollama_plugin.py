@@ -0,0 +1,748 @@
+from __future__ import annotations
+
+import os
+import sys
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Optional
+
+from appdirs import user_cache_dir, user_config_dir
+from PyQt6.QtCore import QTimer, pyqtSignal
+
+from f7.utils import remove_none
+
+from ..base_plugin import PluginInterface, Thread
+from .budget import COMPACT_MODES, compact, context_budget, token_counter
+from .chunking import split_lines
+from .fence_parser import DONE, FenceParser
+from .llama_manager import llama_manager
+from .response_cache import ResponseCache, digest
+
+SYSPROMPT = """You are a string tool. You'll get input as:
+text:`<text>` request:`<operation>`
+Reply with exactly the transformed string—nothing else, no code fences or explanations."""
+
+
+def _keep_alive(value: str):
+    """Ollama takes a duration ("30m") or a number of seconds (-1 keeps the model loaded)."""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+@remove_none
+def _ollama_opts(settings):
+    opts = {
+        "temperature": settings.temperature,
+        "top_p": settings.top_p,
+        "frequency_penalty": settings.frequency_penalty,
+        "presence_penalty": settings.presence_penalty,
+        "seed": settings.seed,
+        "stop": settings.stop_sequences,
+        "num_predict": settings.max_tokens,
+    }
+    return opts
+
+
+@remove_none
+def _llama_cpp_opts(settings):
+    opts = {
+        "max_tokens": settings.max_tokens,
+        "temperature": settings.temperature,
+        "top_p": settings.top_p,
+        "frequency_penalty": settings.frequency_penalty,
+        "presence_penalty": settings.presence_penalty,
+        "seed": settings.seed,
+        "stop": settings.stop_sequences,
+    }
+
+    return opts
+
+
+@remove_none
+def _llama_cpp_kwargs(settings):
+    # arguments of the Llama constructor: changing them reloads the model
+    return {
+        "n_threads": settings.llama_cpp_n_threads or (os.cpu_count() or 4),
+        "n_gpu_layers": -1 if settings.llama_cpp_use_GPU else None,
+    }
+
+
+def _llama_cpp_prompt_cache(settings) -> tuple:
+    # arguments of llama_manager.set_prompt_cache
+    return (
+        settings.llama_cpp_prompt_cache,
+        settings.llama_cpp_prompt_cache_mb * 1024 * 1024,
+        os.path.join(user_cache_dir("F7"), "llama_prompt_cache"),
+    )
+
+
+def _llama_cpp_prefix(settings) -> str:
+    # the start shared by every llama.cpp prompt, so its KV state is reused
+    return f"{settings.system_prompt}\n" if settings.system_prompt else ""
+
+
+class AIStreamWorker(Thread):
+    chunk_received = pyqtSignal(str)
+    finished_signal = pyqtSignal(str)
+    error_occurred = pyqtSignal(str)
+
+    def __init__(self, prompt: str, text: str, settings, client=None, max_tokens: Optional[int] = None):
+        """
+        Args:
+            client: The `ollama.Client` to use (kept by the plugin, so its connections are reused).
+            max_tokens: Overrides the max_tokens setting (speculative previews are shorter).
+        """
+        super().__init__()
+        self.prompt = prompt
+        self.text = text
+        self.settings = settings
+        self.client = client
+        self.max_tokens = max_tokens
+        self.finish_reason: Optional[str] = None  # "length" if cut by max_tokens
+        self._running = True
+
+    def run(self):
+        try:
+            buffer, self.finish_reason = self._generate(self.text, self.chunk_received.emit)
+            if self._running:
+                self.finished_signal.emit(buffer)
+        except Exception as e:
+            self.error_occurred.emit(traceback.format_exc() + str(e))
+
+    def _generate(self, text: str, emit) -> tuple[str, Optional[str]]:
+        """Run one request on `text`, passing the streamed pieces to `emit`. Returns (response, finish reason)."""
+        # a worker stopped before its request was sent (the next keystroke) sends nothing
+        if not self._running:
+            return "", None
+        if self.settings.backend == "ollama":
+            client = self.client
+            if client is None:
+                import ollama
+
+                client = ollama.Client(host=self.settings.ollama_host or None)
+
+            messages = [
+                {
+                    "role": "user",
+                    "content": f"text:```\n{text}\n```\nUser request:{self.prompt}",
+                }
+            ]
+            if self.settings.system_prompt:
+                messages.insert(
+                    0, {"role": "system", "content": self.settings.system_prompt}
+                )
+            options = _ollama_opts(self.settings)
+            if self.max_tokens:
+                options["num_predict"] = self.max_tokens
+            model = self.settings.ollama_model
+            prompt_chars = sum(len(message["content"]) for message in messages)
+
+            def finish_reason(chunk):
+                if chunk.get("done"):  # calibrates the token estimate of the next prompts
+                    token_counter.observe(model, prompt_chars, chunk.get("prompt_eval_count") or 0)
+                return chunk.get("done_reason")
+
+            response = client.chat(
+                model=model,
+                messages=messages,
+                stream=True,
+                options=options,
+                keep_alive=_keep_alive(self.settings.ollama_keep_alive),
+            )
+            return self._consume(
+                response,
+                emit,
+                lambda chunk: chunk.get("message", {}).get("content", ""),
+                finish_reason,
+            )
+
+        # the model stays loaded between requests (see llama_manager.py)
+        llama_manager.idle_timeout = self.settings.llama_cpp_idle_timeout or 0
+        with llama_manager.use(
+            self.settings.llama_cpp_model, **_llama_cpp_kwargs(self.settings)
+        ) as llm:
+            if not self._running:  # stopped while waiting for the model (the lock of a previous generation)
+                return "", None
+            import llama_cpp
+
+            llama_manager.set_prompt_cache(*_llama_cpp_prompt_cache(self.settings))
+            prompt_text = self._build_prompt(text)
+            opts = _llama_cpp_opts(self.settings)
+            if self.max_tokens:
+                opts["max_tokens"] = self.max_tokens
+            response = llm.create_completion(
+                prompt_text,
+                stream=True,
+                # checked before each token, so a stopped worker releases the model without waiting for the next chunk
+                stopping_criteria=llama_cpp.StoppingCriteriaList([lambda tokens, logits: not self._running]),
+                **opts,
+            )
+            return self._consume(
+                response,
+                emit,
+                lambda chunk: chunk["choices"][0]["text"],
+                lambda chunk: chunk["choices"][0].get("finish_reason"),
+            )
+
+    def _consume(self, response, emit, get_text, get_finish_reason) -> tuple[str, Optional[str]]:
+        """Emit the streamed chunks, stopping early once the closing code fence arrived."""
+        parts = []
+        finish_reason = None
+        fence = FenceParser() if self.settings.early_stop else None
+        try:
+            for chunk in response:
+                if not self._running:
+                    break
+                content = get_text(chunk)
+                finish_reason = get_finish_reason(chunk) or finish_reason
+                parts.append(content)
+                emit(content)
+                if fence is not None:
+                    fence.feed(content)
+                    if fence.state == DONE:
+                        break  # anything after the code is discarded anyway
+        finally:
+            # closing the stream stops the generation (Ollama aborts when the request is closed)
+            close = getattr(response, "close", None)
+            if close:
+                close()
+        return "".join(parts), finish_reason
+
+    def stop(self):
+        self._running = False
+
+    def _build_prompt(self, text: str):
+        base = f"USER: `{self.prompt}`\ntext:```\n{text}\n```"
+        return _llama_cpp_prefix(self.settings) + base
+
+
+class ChunkedAIWorker(AIStreamWorker):
+    """
+    Runs the request on each chunk of a large selection (see chunking.py), `parallel` chunks at a time,
+    and streams the extracted results joined by newlines, in order: a chunk is emitted once all the chunks before it are.
+    """
+
+    progress = pyqtSignal(int, int)  # chunks done, total
+
+    def __init__(self, prompt: str, chunks: list[str], settings, client=None, max_tokens: Optional[int] = None, parallel: int = 1):
+        super().__init__(prompt, "", settings, client, max_tokens)
+        self.chunks = chunks
+        self.parallel = max(parallel, 1)
+
+    def run(self):
+        results: dict[int, tuple[str, Optional[str]]] = {}
+        parts = []
+        try:
+            with ThreadPoolExecutor(max_workers=self.parallel, thread_name_prefix="f7-ai-chunk") as pool:
+                futures = {
+                    pool.submit(self._generate, chunk, lambda _: None): index
+                    for index, chunk in enumerate(self.chunks)
+                }
+                try:
+                    for future in as_completed(futures):
+                        results[futures[future]] = future.result()
+                        self.progress.emit(len(results), len(self.chunks))
+                        # emit the chunks that are now complete in order
+                        while len(parts) in results and self._running:
+                            response, reason = results[len(parts)]
+                            code = FenceParser()
+                            code.feed(response)
+                            part = code.finish()
+                            self.chunk_received.emit(f"\n{part}" if parts else part)
+                            parts.append(part)
+                            if reason == "length":
+                                self.finish_reason = reason
+                        if not self._running:
+                            break
+                except BaseException:
+                    # before leaving the pool (it waits for its threads): the running chunks stop at their next token
+                    self._running = False
+                    raise
+                finally:
+                    pool.shutdown(wait=False, cancel_futures=True)
+            if self._running:
+                self.finished_signal.emit("\n".join(parts))
+        except Exception as e:
+            self.error_occurred.emit(traceback.format_exc() + str(e))
+
+
+class AiOllamaPlugin(PluginInterface):
+    NAME = "Ollama AI"
+    PREFIX = "!"
+    SUFFIX = "!"
+    PRIORITY = 10
+
+    def __init__(self, api, settings):
+        super().__init__(api, settings)
+        self.current_worker: AIStreamWorker | None = None
+        self._fence = FenceParser()
+        self._preview_started = False
+        self._preview_key: tuple[str, str] | None = None  # (prompt, selection digest) of _last_preview
+        self._selection_digest: tuple[str, str] | None = None  # (selection, digest), the last one hashed
+        self._last_preview = None
+        self._speculation_timer: QTimer | None = None
+        self._speculation: tuple[str, str, str] | None = None  # (input text, prompt, selection) to preview
+        self._speculating = False  # current_worker is a speculative preview
+        self._previewing = False  # current_worker is a preview (not a run whose result closes the window)
+        self._ollama_client = None
+        self._ollama_client_host = None
+        self._warm_up_thread: threading.Thread | None = None
+        self._cache = ResponseCache(os.path.join(user_config_dir("F7"), "ai_cache"))
+
+    def register_settings(self, settings):
+        sec = settings.section("ai_ollama")
+        sec.add("backend", "AI backend", "ollama", str, options=["ollama", "llama_cpp"])
+        sec.add("ollama_model", "Ollama model", "phi3", str)
+        sec.add("ollama_host", "Ollama server URL (empty: OLLAMA_HOST or localhost)", "", str)
+        sec.add(
+            "ollama_keep_alive",
+            "How long Ollama keeps the model loaded after a request (e.g. 30m, -1 for ever, empty for the server default)",
+            "30m",
+            str,
+        )
+        sec.add(
+            "ollama_prewarm",
+            "Load the Ollama model in the background when the window opens",
+            False,
+            bool,
+        )
+        sec.add("llama_cpp_model", "Llama.cpp model path", "", str)
+        sec.add(
+            "llama_cpp_n_threads",
+            "Number of threads to use for generation (default: os.cpu_count)",
+            None,
+            int,
+        )
+        sec.add("llama_cpp_use_GPU", "Use GPU", False, bool)
+        sec.add(
+            "llama_cpp_preload",
+            "Load the llama.cpp model when F7 starts, so the first request does not wait for it",
+            False,
+            bool,
+        )
+        sec.add(
+            "llama_cpp_idle_timeout",
+            "Free the llama.cpp model after this many seconds without requests (0: keep it loaded)",
+            600,
+            int,
+        )
+        sec.add(
+            "llama_cpp_prompt_cache",
+            "Keep llama.cpp states of past prompts, to skip re-evaluating a shared start (the system prompt is always reused)",
+            "off",
+            str,
+            options=["off", "ram", "disk"],
+        )
+        sec.add("llama_cpp_prompt_cache_mb", "Size (MB) of the llama.cpp prompt cache", 1024, int)
+        sec.add("system_prompt", "System prompt", SYSPROMPT, str)
+        sec.add("max_tokens", "Max tokens", 100, int)
+        sec.add("temperature", "Temperature", None, float)
+        sec.add("top_p", "Top-p", None, float)
+        sec.add("frequency_penalty", "Freq penalty", None, float)
+        sec.add("presence_penalty", "Presence penalty", None, float)
+        sec.add("timeout", "Timeout sec", 30, int)
+        sec.add("seed", "Random seed", None, int)
+        sec.add("stop_sequences", "Stop seqs", None, list)
+        sec.add(
+            "response_cache",
+            "Remember AI results on disk, for deterministic requests (temperature 0 or a fixed seed)",
+            False,
+            bool,
+        )
+        sec.add("response_cache_mb", "Maximum size (MB) of the AI result cache", 50, int)
+        sec.add(
+            "early_stop",
+            "Stop generating once the code block is closed (the text after it is not used)",
+            True,
+            bool,
+        )
+        sec.add(
+            "speculative_preview",
+            "Preview the AI result automatically once typing pauses (Enter reuses it if the request is unchanged)",
+            False,
+            bool,
+        )
+        sec.add("speculative_delay_ms", "Typing pause (ms) before a speculative preview", 700, int)
+        sec.add(
+            "speculative_max_tokens",
+            "Max tokens of a speculative preview (a cut result is generated again in full on Enter)",
+            48,
+            int,
+        )
+        sec.add(
+            "chunk_tokens",
+            "Model context (tokens): a larger selection is split into chunks of lines, each sent with the request (0: off)",
+            0,
+            int,
+        )
+        sec.add(
+            "chunk_parallel",
+            "Chunks sent to Ollama at once (match the server's OLLAMA_NUM_PARALLEL)",
+            2,
+            int,
+        )
+        sec.add(
+            "prompt_budget",
+            "Warn when the prompt is over this many tokens (0: the model context, from chunk_tokens or the llama.cpp model)",
+            0,
+            int,
+        )
+        sec.add(
+            "compact_input",
+            "Shrink a selection over the token budget: strip extra whitespace, drop consecutive repeated lines, or both",
+            "off",
+            str,
+            options=COMPACT_MODES,
+        )
+
+    def on_startup(self) -> None:
+        cfg = self.settings.ai_ollama
+        if cfg.backend == "llama_cpp" and cfg.llama_cpp_preload and cfg.llama_cpp_model:
+            llama_manager.idle_timeout = cfg.llama_cpp_idle_timeout or 0
+            llama_manager.preload(
+                cfg.llama_cpp_model,
+                prefix=_llama_cpp_prefix(cfg),
+                cache=_llama_cpp_prompt_cache(cfg),
+                **_llama_cpp_kwargs(cfg),
+            )
+
+    def _get_ollama_client(self):
+        """The plugin's `ollama.Client`: one HTTP connection pool, reused by every request."""
+        import ollama
+
+        host = self.settings.ai_ollama.ollama_host or None
+        if self._ollama_client is None or host != self._ollama_client_host:
+            self._ollama_client = ollama.Client(host=host)
+            self._ollama_client_host = host
+        return self._ollama_client
+
+    def on_window_show(self) -> None:
+        cfg = self.settings.ai_ollama
+        if cfg.backend != "ollama" or not cfg.ollama_prewarm:
+            return
+        if self._warm_up_thread and self._warm_up_thread.is_alive():
+            return
+        self._warm_up_thread = threading.Thread(
+            target=self._warm_up, name="f7-ollama-warm-up", daemon=True
+        )
+        self._warm_up_thread.start()
+
+    def _warm_up(self):
+        # a generate request without a prompt only loads the model
+        cfg = self.settings.ai_ollama
+        try:
+            self._get_ollama_client().generate(
+                model=cfg.ollama_model, prompt="", keep_alive=_keep_alive(cfg.ollama_keep_alive)
+            )
+        except Exception as e:
+            print(f"AI: Ollama warm-up failed: {e}", file=sys.stderr)
+
+    def get_status_message(self) -> str:
+        cfg = self.settings.ai_ollama
+        model = (
+            cfg.ollama_model
+            if cfg.backend == "ollama"
+            else os.path.basename(cfg.llama_cpp_model)
+        )
+        return f"🤖 {cfg.backend} ({model}) - Ctrl+Enter: preview, Enter: run"
+
+    def _cache_key(self, prompt: str, text: str) -> Optional[str]:
+        """The response cache key, or None if caching is off or the output is not deterministic."""
+        cfg = self.settings.ai_ollama
+        if not cfg.response_cache or not (cfg.temperature == 0 or cfg.seed is not None):
+            return None
+        if cfg.backend == "ollama":
+            model, options = cfg.ollama_model, _ollama_opts(cfg)
+        else:
+            try:  # a replaced model file must not hit the old results
+                stat = os.stat(cfg.llama_cpp_model)
+            except OSError:
+                return None
+            model = (cfg.llama_cpp_model, stat.st_size, stat.st_mtime)
+            options = _llama_cpp_opts(cfg)
+        return ResponseCache.key(
+            backend=cfg.backend,
+            model=model,
+            system_prompt=cfg.system_prompt,
+            prompt=prompt,
+            selection=digest(text),
+            options=options,
+            **({"chunk_tokens": cfg.chunk_tokens} if cfg.chunk_tokens else {}),
+            **({"compact_input": cfg.compact_input} if cfg.compact_input != "off" else {}),
+        )
+
+    def _count_tokens(self, text: str) -> int:
+        cfg = self.settings.ai_ollama
+        model = cfg.ollama_model if cfg.backend == "ollama" else cfg.llama_cpp_model
+        return token_counter.count(text, cfg.backend, model)
+
+    def _fit(self, prompt: str, text: str) -> tuple[str, int, int, str]:
+        """
+        Count the prompt's tokens, compacting the selection if it is over the budget (compact_input).
+
+        Returns:
+            (text, overhead, tokens, note): the selection to send, the tokens of the system prompt and request,
+            the tokens of the selection (0 if not counted), and a status note on the compaction or the overflow.
+        """
+        cfg = self.settings.ai_ollama
+        budget = context_budget(cfg)
+        if not budget and not cfg.chunk_tokens:
+            return text, 0, 0, ""
+        overhead = self._count_tokens(cfg.system_prompt or "") + self._count_tokens(prompt)
+        tokens = self._count_tokens(text)
+        if not budget or overhead + tokens <= budget:
+            return text, overhead, tokens, ""
+        note = ""
+        if cfg.compact_input != "off":
+            compacted = compact(text, cfg.compact_input)
+            if compacted != text:
+                compacted_tokens = self._count_tokens(compacted)
+                note = f"🗜️ {overhead + tokens} → {overhead + compacted_tokens} tokens"
+                text, tokens = compacted, compacted_tokens
+        if overhead + tokens > budget and not cfg.chunk_tokens:  # chunks are split to fit anyway
+            note = f"⚠️ {overhead + tokens} tokens, over the {budget} budget"
+        return text, overhead, tokens, note
+
+    def _split(self, text: str, overhead: int, tokens: int) -> Optional[list[str]]:
+        """
+        The chunks of a selection that does not fit in `chunk_tokens`, or None to send it whole.
+
+        Args:
+            overhead, tokens: The counts from _fit.
+        """
+        cfg = self.settings.ai_ollama
+        if not cfg.chunk_tokens:
+            return None
+        # the system prompt, the request and the answer share the context with the text
+        overhead += cfg.max_tokens or 0
+        if not tokens or overhead + tokens <= cfg.chunk_tokens:
+            return None
+        chars_per_token = len(text) / tokens
+        chunks = split_lines(text, int(max(cfg.chunk_tokens - overhead, 1) * chars_per_token))
+        return chunks if len(chunks) > 1 else None
+
+    def _stop_current(self):
+        # its queued chunks must not reach the next parser
+        old, self.current_worker = self.current_worker, None
+        self._speculating = False
+        self._previewing = False
+        if old is None:
+            return
+        signals = [old.chunk_received, old.finished_signal, old.error_occurred]
+        if isinstance(old, ChunkedAIWorker):
+            signals.append(old.progress)
+        for sig in signals:
+            try:
+                sig.disconnect()
+            except TypeError:
+                pass  # nothing connected
+        # not waited for: this runs on every keystroke during a speculation, and a worker loading the model
+        # or evaluating the prompt only sees the stop at its next token. it leaves active_workers when it ends
+        old.stop()
+
+    def _start(
+        self,
+        prompt: str,
+        text: str,
+        is_preview: bool,
+        speculative: bool = False,
+        max_tokens: Optional[int] = None,
+    ):
+        """
+        Args:
+            speculative: Started by a typing pause; the next keystroke cancels it.
+            max_tokens: A lower limit than the setting; a result cut by it is not reused.
+        """
+        self._stop_current()
+        self._speculating = speculative
+        self._previewing = is_preview
+
+        self._fence = FenceParser()
+        self._preview_started = False
+        self.api.update_preview_content("")  # hide the preview.
+        cache_key = self._cache_key(prompt, text)  # of the selection as given
+        text, overhead, tokens, note = self._fit(prompt, text)
+        self.api.set_status(f"⏳ Contacting AI... {note}" if note else "⏳ Contacting AI...")
+
+        cfg = self.settings.ai_ollama
+        client = None
+        if cfg.backend == "ollama":
+            try:
+                client = self._get_ollama_client()
+            except ImportError:
+                pass  # the worker reports it
+        rounds = 1
+        chunks = self._split(text, overhead, tokens)
+        if chunks:
+            # llama.cpp runs one generation at a time
+            parallel = max(cfg.chunk_parallel or 1, 1) if cfg.backend == "ollama" else 1
+            rounds = -(-len(chunks) // parallel)
+            worker = ChunkedAIWorker(prompt, chunks, cfg, client, max_tokens, parallel)
+            worker.progress.connect(
+                lambda done, total: self.api.set_status(f"⏳ AI: {done}/{total} chunks done")
+            )
+        else:
+            worker = AIStreamWorker(prompt, text, cfg, client, max_tokens)
+        self.current_worker = worker
+        self.active_workers.append(worker)
+        worker.finished.connect(lambda: self._forget_worker(worker))
+
+        worker.chunk_received.connect(lambda c: self._on_chunk(c, is_preview))
+        worker.finished_signal.connect(
+            lambda full: self._on_done(
+                full, is_preview, cache_key, max_tokens is None or worker.finish_reason != "length"
+            )
+        )
+        worker.error_occurred.connect(lambda err: self._on_error(err))
+
+        worker.start()
+        timeout = self.settings.ai_ollama.timeout
+        if timeout and timeout > 0:
+            QTimer.singleShot(timeout * rounds * 1000, worker.stop)
+
+    def _forget_worker(self, worker: AIStreamWorker):
+        if worker in self.active_workers:
+            self.active_workers.remove(worker)
+
+    def _on_chunk(self, chunk: str, is_preview: bool):
+        print(chunk, end="")
+        # each chunk is parsed once; only the new visible text is appended to the preview
+        reset, delta = self._fence.feed(chunk)
+        if reset:  # the text shown so far was not the code
+            self._preview_started = False
+            self.api.update_preview_content("")
+        if delta:
+            if self._preview_started:
+                self.api.append_preview_content(delta)
+            else:
+                self.api.update_preview_content(f"AI: {delta}")
+                self._preview_started = True
+
+    def _on_done(
+        self, full: str, is_preview: bool, cache_key: Optional[str] = None, complete: bool = True
+    ):
+        result = self._fence.finish()
+        self._speculating = False
+        if not complete:
+            # cut by the speculative max_tokens: shown, but Enter asks for the full result
+            self._last_preview = None
+            self.api.set_status("✅ Preview ready (partial)")
+            return
+        if cache_key:
+            self._cache.put(cache_key, result, self.settings.ai_ollama.response_cache_mb * 1024 * 1024)
+        if is_preview:
+            self._last_preview = result
+            self.api.set_status("✅ Preview ready")
+        else:
+            self.api.close(copy_and_close_text=result)
+
+    def _on_error(self, msg: str):
+        print("AI error:", msg)
+        self.api.update_preview_content(msg)
+        self.api.set_status(f"❌ Error: {msg}")
+
+    def update_preview(self, command: str, selected_text: str, manual: bool) -> None:
+        if not manual:
+            self._schedule_speculation(command, selected_text)
+            return
+        self._cancel_speculation()
+        cmd = command.lstrip(self.PREFIX).rstrip(self.SUFFIX)
+
+        if not cmd:
+            return
+        self._preview_key = self._key_of(cmd, selected_text)
+        self._last_preview = None
+        cached = self._cached_result(cmd, selected_text)
+        if cached is not None:
+            self._last_preview = cached
+            self.api.update_preview_content(f"AI: {cached}")
+            self.api.set_status("✅ Preview ready (cached)")
+            return
+        self._start(cmd, selected_text, True)
+
+    def _key_of(self, prompt: str, text: str) -> tuple[str, str]:
+        """Identifies a request, so a preview is only reused for the same prompt on the same selection."""
+        # the selection is the same object on every keystroke: hash it once
+        if self._selection_digest is None or self._selection_digest[0] is not text:
+            self._selection_digest = (text, digest(text))
+        return prompt, self._selection_digest[1]
+
+    def _schedule_speculation(self, command: str, selected_text: str):
+        """Called on every keystroke: cancel the running speculation, and restart the typing-pause timer."""
+        cfg = self.settings.ai_ollama
+        if not cfg.speculative_preview:
+            return
+        self._cancel_speculation()
+        cmd = command.lstrip(self.PREFIX).rstrip(self.SUFFIX)
+        if not cmd.strip() or (
+            self._key_of(cmd, selected_text) == self._preview_key and self._last_preview is not None
+        ):
+            return
+        if self._speculation_timer is None:
+            self._speculation_timer = QTimer()
+            self._speculation_timer.setSingleShot(True)
+            self._speculation_timer.timeout.connect(self._start_speculation)
+        self._speculation = (command, cmd, selected_text)
+        self._speculation_timer.start(max(cfg.speculative_delay_ms, 0))
+
+    def _cancel_speculation(self):
+        if self._speculation_timer is not None:
+            self._speculation_timer.stop()
+        self._speculation = None
+        if self._speculating:
+            self._stop_current()
+
+    def on_deactivate(self) -> None:
+        # the input left the AI plugin: its preview must not write into the next plugin's preview
+        self._cancel_speculation()
+        if self._previewing:
+            self._stop_current()
+
+    def _start_speculation(self):
+        speculation, self._speculation = self._speculation, None
+        if speculation is None:
+            return
+        command, cmd, selected_text = speculation
+        if self.api.get_input_text() != command:
+            return  # the input moved on (e.g. to another plugin) without reaching update_preview
+        cfg = self.settings.ai_ollama
+        self._preview_key = self._key_of(cmd, selected_text)
+        self._last_preview = None
+        cached = self._cached_result(cmd, selected_text)
+        if cached is not None:
+            self._last_preview = cached
+            self.api.update_preview_content(f"AI: {cached}")
+            self.api.set_status("✅ Preview ready (cached)")
+            return
+        max_tokens = cfg.speculative_max_tokens or None
+        if max_tokens and cfg.max_tokens and max_tokens >= cfg.max_tokens:
+            max_tokens = None  # not shorter than a normal preview
+        self._start(cmd, selected_text, True, speculative=True, max_tokens=max_tokens)
+
+    def execute(self, command: str, selected_text: str) -> Optional[str]:
+        self._cancel_speculation()
+        cmd = command.lstrip(self.PREFIX).rstrip(self.SUFFIX)
+        if self._key_of(cmd, selected_text) == self._preview_key and self._last_preview:
+            return self._last_preview
+        cached = self._cached_result(cmd, selected_text)
+        if cached is not None:
+            return cached
+        self._start(cmd, selected_text, False)
+        return None
+
+    def _cached_result(self, prompt: str, text: str) -> Optional[str]:
+        key = self._cache_key(prompt, text)
+        return self._cache.get(key) if key else None
+
+    def cleanup(self) -> None:
+        super().cleanup()
+        if self.current_worker and self.current_worker.isRunning():
+            self.current_worker.stop()
+            self.current_worker.quit()
+            self.current_worker.wait()
+        llama_manager.unload()
@@ -0,0 +1,84 @@
+import math
+import re
+from typing import Optional
+
+from .llama_manager import llama_manager
+
+"""
+token counts of a prompt before it is sent, so an input over the model context is caught (and optionally compacted)
+instead of being slowly processed and truncated.
+llama.cpp counts with the loaded model's tokenizer. Ollama has no tokenize API: its count is estimated from
+the characters per token of the previous prompts (their prompt_eval_count), starting from a rough default.
+"""
+
+CHARS_PER_TOKEN = 4  # rough size of a token, for English text and code
+
+COMPACT_MODES = ["off", "whitespace", "dedupe", "both"]
+
+_SPACES_RE = re.compile(r"(?<=\S) {2,}")
+_BLANK_LINES_RE = re.compile(r"\n{3,}")
+
+
+class TokenCounter:
+    def __init__(self):
+        self._chars_per_token: dict[str, float] = {}  # Ollama model -> smallest ratio seen
+        # the last texts tokenized by llama.cpp, as (text, model, tokens): a selection is counted once, not per request
+        self._counted: list[tuple[str, str, int]] = []
+
+    def observe(self, model: str, chars: int, tokens: int) -> None:
+        """
+        Record the token count Ollama reported for a prompt of `chars` characters.
+        The smallest ratio is kept: a prompt partly served from Ollama's cache reports fewer tokens.
+        """
+        if tokens > 0:
+            ratio = max(chars / tokens, 1.0)
+            seen = self._chars_per_token.get(model)
+            self._chars_per_token[model] = ratio if seen is None else min(ratio, seen)
+
+    def chars_per_token(self, backend: str, model: str) -> float:
+        return self._chars_per_token.get(model, CHARS_PER_TOKEN) if backend == "ollama" else CHARS_PER_TOKEN
+
+    def count(self, text: str, backend: str, model: str) -> int:
+        if not text:
+            return 0
+        if backend == "llama_cpp":
+            for counted, counted_model, tokens in self._counted:
+                if counted is text and counted_model == model:
+                    return tokens
+            tokens = llama_manager.count_tokens(text)
+            if tokens is not None:
+                self._counted = [(text, model, tokens)] + self._counted[:3]
+                return tokens
+        return math.ceil(len(text) / self.chars_per_token(backend, model))
+
+
+token_counter = TokenCounter()
+
+
+def compact(text: str, mode: str) -> str:
+    """
+    Shrink a selection for the prompt.
+
+    Args:
+        mode: "whitespace" strips trailing spaces, runs of spaces after the indentation and repeated blank lines,
+            "dedupe" drops lines identical to the line before (like `uniq`), "both" does both ("off" returns `text`).
+    """
+    if mode in ("whitespace", "both"):
+        text = "\n".join(_SPACES_RE.sub(" ", line.rstrip()) for line in text.splitlines())
+        text = _BLANK_LINES_RE.sub("\n\n", text).strip("\n")
+    if mode in ("dedupe", "both"):
+        lines = text.splitlines()
+        text = "\n".join(line for i, line in enumerate(lines) if i == 0 or line != lines[i - 1])
+    return text
+
+
+def context_budget(settings) -> Optional[int]:
+    """Tokens available for the prompt: `prompt_budget`, or the model context minus the answer (None: unknown)."""
+    if settings.prompt_budget:
+        return settings.prompt_budget
+    context = settings.chunk_tokens
+    if not context and settings.backend == "llama_cpp":
+        context = llama_manager.context_size()
+    if not context:
+        return None
+    return max(context - (settings.max_tokens or 0), 1)
@@ -0,0 +1,29 @@
+"""
+map-reduce over large selections: a selection that does not fit in the model context is split on line boundaries,
+each chunk is sent with the same request, and the results are joined in order.
+only suited to line-wise requests ("translate each line"), as the model never sees the whole text.
+"""
+
+
+def split_lines(text: str, max_chars: int) -> list[str]:
+    """
+    Split `text` into chunks of whole lines, each at most `max_chars` long
+    (a longer line is a chunk of its own). The newline ending a chunk ("\n" or "\r\n") is dropped.
+    Only "\n" ends a line: other line breaks of str.splitlines (e.g. "\x0b", "\u2028") stay inside it.
+    """
+    chunks = []
+    current: list[str] = []
+    size = 0
+    lines = text.split("\n")
+    if lines[-1] == "":
+        lines.pop()  # text ending with a newline
+    for line in lines:
+        line += "\n"
+        if current and size + len(line) > max_chars:
+            chunks.append("".join(current))
+            current, size = [], 0
+        current.append(line)
+        size += len(line)
+    if current:
+        chunks.append("".join(current))
+    return [chunk.removesuffix("\n").removesuffix("\r") for chunk in chunks]
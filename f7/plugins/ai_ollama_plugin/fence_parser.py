@@ -0,0 +1,115 @@
+import re
+
+"""
+extracts the code of a streamed response: the body of its first fenced block, or the whole response (stripped)
+if it has none. each chunk is scanned once, and only the newly visible text is returned.
+"""
+
+_LANG_RE = re.compile(r"[\w\-\+]*")
+
+SEARCH, CODE, DONE = range(3)
+
+
+class FenceParser:
+    """
+    The visible text is the whole response (stripped), until an opening fence (```lang + newline) shows up.
+    From then on it is only the code inside the fence, up to the closing fence.
+
+    feed() holds back what could still turn into a fence (e.g. a trailing "``"),
+    and trailing whitespace (it is stripped unless more text follows).
+    """
+
+    def __init__(self):
+        self.state = SEARCH
+        self._pending = ""  # received but not scanned yet
+        self._parts: list[str] = []  # visible text so far
+        self._space = ""  # held back trailing whitespace
+        self._started = False  # leading whitespace was skipped
+
+    @property
+    def text(self) -> str:
+        return "".join(self._parts)
+
+    def feed(self, chunk: str) -> tuple[bool, str]:
+        """
+        Returns:
+            (reset, delta): `reset` if the text shown so far must be discarded (an opening fence was found),
+            `delta` the text to append.
+        """
+        self._pending += chunk
+        reset = False
+        out = []
+        if self.state == SEARCH:
+            reset = self._search(out)
+        if self.state == CODE:
+            self._code(out)
+        if self.state == DONE:
+            self._pending = ""
+        return reset, "".join(out)
+
+    def finish(self) -> str:
+        """Flush what was held back, and return the final text (an unclosed fence runs to the end of the response)."""
+        if self.state != DONE:
+            self._emit(self._pending, [])
+            self._pending = ""
+        return self.text
+
+    def _search(self, out: list[str]) -> bool:
+        pending = self._pending
+        start = 0
+        while True:
+            index = pending.find("```", start)
+            if index == -1:
+                # a trailing "`" or "``" may be the start of a fence
+                keep = len(pending) - len(pending.rstrip("`"))
+                keep = min(keep, 2)
+                self._emit(pending[: len(pending) - keep], out)
+                self._pending = pending[len(pending) - keep :]
+                return False
+            lang = _LANG_RE.match(pending, index + 3)
+            after = lang.end()
+            if after == len(pending):
+                # "```lang" without its newline yet: wait for more
+                self._emit(pending[:index], out)
+                self._pending = pending[index:]
+                return False
+            if pending[after] == "\n":
+                # opening fence: from now on only the code is visible
+                self._parts = []
+                self._space = ""
+                self._started = False
+                out.clear()
+                self._pending = pending[after + 1 :]
+                self.state = CODE
+                return True
+            start = index + 1
+
+    def _code(self, out: list[str]):
+        pending = self._pending
+        index = pending.find("\n```")
+        if index != -1:
+            self._emit(pending[:index], out)
+            self._pending = ""
+            self.state = DONE
+            return
+        # hold back a trailing "\n", "\n`" or "\n``"
+        cut = pending.rfind("\n", max(0, len(pending) - 3))
+        if cut != -1 and pending[cut + 1 :] == "`" * (len(pending) - cut - 1):
+            self._emit(pending[:cut], out)
+            self._pending = pending[cut:]
+        else:
+            self._emit(pending, out)
+            self._pending = ""
+
+    def _emit(self, text: str, out: list[str]):
+        if not self._started:
+            text = text.lstrip()
+            if not text:
+                return
+            self._started = True
+        text = self._space + text
+        visible = text.rstrip()
+        self._space = text[len(visible) :]
+        if visible:
+            self._parts.append(visible)
+            out.append(visible)
@@ -0,0 +1,152 @@
+import os
+import sys
+import threading
+from contextlib import contextmanager
+from typing import Optional
+
+"""
+process-wide owner of the llama.cpp model: loading a GGUF file takes seconds (and gigabytes),
+so the `Llama` instance is kept resident across requests, and freed after an idle timeout.
+
+a resident model also keeps its KV cache: llama.cpp only evaluates the tokens after the longest prefix
+shared with the previous prompt, so the system prompt is evaluated once. `prime` evaluates it ahead of
+the first request, and an optional prompt cache (RAM or disk) keeps states across different prompts and reloads.
+"""
+
+
+class LlamaManager:
+    def __init__(self):
+        self._llm = None
+        self._key: Optional[tuple] = None  # (model path, constructor kwargs) of the loaded model
+        self._lock = threading.RLock()  # a Llama instance can only run one generation at a time
+        # held to free the model, and to tokenize without waiting for a generation (tokenizing only reads the vocabulary)
+        self._free_lock = threading.Lock()
+        self._idle_timer: Optional[threading.Timer] = None
+        self.idle_timeout = 0.0  # seconds, 0 keeps the model loaded until exit
+        self._cache_config: Optional[tuple] = None  # prompt cache set on the loaded model
+
+    @property
+    def loaded(self) -> bool:
+        return self._llm is not None
+
+    def _load(self, model_path: str, kwargs: dict):
+        key = (model_path, tuple(sorted(kwargs.items())))
+        if self._llm is not None and self._key == key:
+            return self._llm
+        self.unload()  # a different model, or its threads/GPU settings changed
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"Model file not found: {model_path}")
+        import llama_cpp
+
+        self._llm = llama_cpp.Llama(model_path=model_path, verbose=False, **kwargs)
+        self._key = key
+        self._cache_config = None
+        return self._llm
+
+    def set_prompt_cache(self, mode: str, capacity_bytes: int, cache_dir: str) -> None:
+        """
+        Keep the KV states of past prompts in RAM or on disk ("ram", "disk" or "off"),
+        restored for a new prompt that shares their prefix. Applies to the loaded model.
+        """
+        with self._lock:
+            if self._llm is None or self._cache_config == (mode, capacity_bytes, cache_dir):
+                return
+            import llama_cpp
+
+            if mode == "ram":
+                cache = llama_cpp.LlamaRAMCache(capacity_bytes=capacity_bytes)
+            elif mode == "disk":
+                cache = llama_cpp.LlamaDiskCache(cache_dir=cache_dir, capacity_bytes=capacity_bytes)
+            else:
+                cache = None
+            self._llm.set_cache(cache)
+            self._cache_config = (mode, capacity_bytes, cache_dir)
+
+    def prime(self, prefix: str) -> None:
+        """Evaluate the shared start of every prompt (the system prompt) on the loaded model."""
+        with self._lock:
+            llm = self._llm
+            if llm is None or not prefix:
+                return
+            tokens = llm.tokenize(prefix.encode("utf-8"), special=True)
+            if list(llm._input_ids[: len(tokens)]) == tokens:
+                return  # already in the KV cache
+            llm.reset()
+            llm.eval(tokens)
+            if llm.cache is not None:
+                llm.cache[tuple(tokens)] = llm.save_state()
+
+    def count_tokens(self, text: str) -> Optional[int]:
+        """Tokens of `text` with the loaded model's tokenizer, or None if no model is loaded."""
+        with self._free_lock:
+            llm = self._llm
+            if llm is None:
+                return None
+            return len(llm.tokenize(text.encode("utf-8"), add_bos=False, special=True))
+
+    def context_size(self) -> Optional[int]:
+        with self._free_lock:
+            llm = self._llm
+            return llm.n_ctx() if llm is not None else None
+
+    @contextmanager
+    def use(self, model_path: str, **kwargs):
+        """Get the model (loading it if needed), with exclusive use of it until the block ends."""
+        with self._lock:
+            self._cancel_idle_timer()
+            try:
+                yield self._load(model_path, kwargs)
+            finally:
+                self._start_idle_timer()
+
+    def preload(self, model_path: str, prefix: str = "", cache: Optional[tuple] = None, **kwargs) -> None:
+        """
+        Load the model on a background thread, and evaluate `prefix` (see prime).
+
+        Args:
+            cache: The (mode, capacity_bytes, cache_dir) arguments of set_prompt_cache.
+        """
+
+        def target():
+            try:
+                with self.use(model_path, **kwargs):
+                    if cache:
+                        self.set_prompt_cache(*cache)
+                    self.prime(prefix)
+            except Exception as e:
+                print(f"AI: Could not preload the llama.cpp model: {e}", file=sys.stderr)
+
+        threading.Thread(target=target, name="f7-llama-preload", daemon=True).start()
+
+    def unload(self) -> None:
+        with self._lock:
+            self._cancel_idle_timer()
+            with self._free_lock:
+                llm, self._llm, self._key = self._llm, None, None
+                if llm is not None:
+                    close = getattr(llm, "close", None)  # frees the weights right away (llama-cpp-python >= 0.2.x)
+                    if close:
+                        close()
+                    del llm
+
+    def _start_idle_timer(self):
+        if self.idle_timeout > 0 and self._llm is not None:
+            self._idle_timer = threading.Timer(self.idle_timeout, self._unload_if_idle)
+            self._idle_timer.daemon = True
+            self._idle_timer.start()
+
+    def _cancel_idle_timer(self):
+        if self._idle_timer is not None:
+            self._idle_timer.cancel()
+            self._idle_timer = None
+
+    def _unload_if_idle(self):
+        # a request in progress holds the lock; it restarts the timer when it ends
+        if self._lock.acquire(blocking=False):
+            try:
+                self.unload()
+            finally:
+                self._lock.release()
+
+
+llama_manager = LlamaManager()
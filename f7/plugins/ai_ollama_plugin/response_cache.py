@@ -0,0 +1,64 @@
+import hashlib
+import json
+import os
+import sys
+import tempfile
+from typing import Optional
+
+"""
+disk cache of AI results (one file per response), for deterministic requests only.
+the least recently used files are evicted when the cache grows over its size limit;
+a hit refreshes the file's mtime, which is the LRU order.
+"""
+
+
+def digest(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).hexdigest()
+
+
+class ResponseCache:
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    @staticmethod
+    def key(**parts) -> str:
+        return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.txt")
+
+    def get(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                result = f.read()
+            os.utime(path)
+        except OSError:
+            return None
+        return result
+
+    def put(self, key: str, result: str, max_bytes: int) -> None:
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            # written to a temp file first, so a reader never sees half a response
+            fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(result)
+            os.replace(tmp, self._path(key))
+            self._evict(max_bytes)
+        except OSError as e:
+            print(f"AI: Could not write the response cache: {e}", file=sys.stderr)
+
+    def _evict(self, max_bytes: int) -> None:
+        entries = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith(".txt"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= max_bytes:
+                break
+            os.unlink(path)
+            total -= size
@@ -1,9 +1,12 @@
 # base_plugin.py
+import re
 from abc import ABC, abstractmethod
 from typing import TYPE_CHECKING, List, Optional
 
 from PyQt6.QtCore import QThread
 
+from ..utils import WORD_BOUNDARY_RE
+
 
 if TYPE_CHECKING:
     from ..api import API
@@ -34,6 +37,8 @@ class PluginInterface(ABC):
     IS_DEFAULT: bool = False
     PRIORITY: int = 99
     HAS_AUTOCOMPLETE: bool = False
+    # the word being completed, used to re-filter the popup while typing
+    COMPLETION_WORD_RE: re.Pattern = WORD_BOUNDARY_RE
 
     def __init__(self, api_instance: "API", settings: "Settings"):
         """
@@ -117,6 +122,37 @@ class PluginInterface(ABC):
         # Plugins with HAS_AUTOCOMPLETE = True should override this.
         pass
 
+    def cancel(self) -> bool:
+        """
+        Optional: Cancel a running (async) execution, called when the user presses Escape.
+
+        Returns:
+            True if something was cancelled (the window then stays open),
+            False to let Escape close the window as usual.
+        """
+        return False
+
+    def on_startup(self) -> None:
+        """
+        Optional: Called once when F7 starts (usually into the tray), after the settings were loaded.
+        Use it to start background preloading; never block here.
+        """
+        pass
+
+    def on_deactivate(self) -> None:
+        """
+        Optional: Called when the input stops matching this plugin (e.g. its prefix was deleted) or the window is reset.
+        Stop background work that would still write to the preview.
+        """
+        pass
+
+    def on_window_show(self) -> None:
+        """
+        Optional: Called every time the F7 window is shown (from tray, hotkey or socket).
+        Use it for cheap checks or to start background warm-up work; never block here.
+        """
+        pass
+
     def cleanup(self) -> None:
         """Optional: Clean up resources, including stopping any active workers."""
         for worker in self.active_workers[:]:
@@ -0,0 +1 @@
+from .cmd_plugin import CmdPlugin
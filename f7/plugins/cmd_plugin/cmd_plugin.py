@@ -0,0 +1,905 @@
+import os
+import re
+import shlex
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Optional, Union
+
+from PyQt6.QtCore import QTimer
+
+from f7.custom_types import pyqtSignal
+
+from ..base_plugin import PluginInterface, Thread
+from .direct_exec import direct_argv, forget
+from .output import OutputBuffer
+from .path_index import PathIndex, complete_command
+from .result_cache import DEFAULT_IMPURE, PreviewCache, is_pure
+from .warm_shell import WarmShell, WarmShellError
+
+
+def get_default_shell() -> list[str]:
+    """Return the default shell executable and argument based on the current OS."""
+    if sys.platform == "win32":
+        return [os.environ.get("COMSPEC", "cmd.exe"), "/c"]
+    else:
+        return [os.environ.get("SHELL", "/bin/sh"), "-c"]
+
+
+def _build_process(
+    cmd: str, shell_exec: str, flag: str, argv: Optional[list[str]] = None, stdin=subprocess.PIPE
+):
+    # Build a subprocess invocation using explicit shell executable,
+    # or exec the program directly if `argv` is given (see direct_exec.py).
+    # The pipes are binary: the output is read incrementally by _pump, and decoded only for display.
+    # The process gets its own process group, so _kill_tree can stop its children too
+    if sys.platform == "win32":
+        group = {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+    else:
+        group = {"start_new_session": True}
+    return subprocess.Popen(
+        argv or [shell_exec, flag, cmd],
+        stdin=stdin,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        **group,
+    )
+
+
+def _kill_tree(proc: subprocess.Popen):
+    """Kill the process and everything it started (e.g. `yes | head` or `sleep 100 &`)."""
+    try:
+        if sys.platform == "win32":
+            if proc.poll() is None:
+                subprocess.run(
+                    ["taskkill", "/F", "/T", "/PID", str(proc.pid)],
+                    capture_output=True,
+                    creationflags=subprocess.CREATE_NO_WINDOW,
+                )
+        else:
+            # even if the shell already exited, its children may still be in the group
+            os.killpg(proc.pid, signal.SIGKILL)
+    except OSError:
+        pass
+    if proc.poll() is None:
+        proc.kill()
+
+
+STDIN_CHUNK = 65536
+
+
+def _stdin_file(data: bytes):
+    """A file holding the selection, to use as stdin instead of a pipe (memfd if available)."""
+    if hasattr(os, "memfd_create"):
+        f = os.fdopen(os.memfd_create("f7-selection", os.MFD_CLOEXEC), "w+b")
+    else:
+        f = tempfile.TemporaryFile()
+    f.write(data)
+    f.seek(0)
+    return f
+
+
+def _feed_stdin(proc: subprocess.Popen, data: bytes):
+    # chunks are sliced from a memoryview, so the selection is never copied again
+    view = memoryview(data)
+    try:
+        fd = proc.stdin.fileno()
+        while view:
+            written = os.write(fd, view[:STDIN_CHUNK])
+            view = view[written:]
+    except OSError:
+        pass  # e.g. BrokenPipeError: the command does not read (all of) its input
+    finally:
+        try:
+            proc.stdin.close()
+        except OSError:
+            pass
+
+
+def _pump(stream, buffer: OutputBuffer):
+    """Read a pipe until EOF into the buffer, as raw bytes."""
+    fd = stream.fileno()
+    try:
+        while chunk := os.read(fd, 65536):
+            buffer.write(chunk)
+    except OSError:
+        pass
+    stream.close()
+
+
+def _clean(text: str) -> str:
+    return text.replace("\r\n", "\n").strip()
+
+
+FILE_CHUNK = 1024 * 1024
+
+
+def _clean_file(path: str) -> None:
+    """
+    `_clean` for a result file, on the raw bytes (the output is never decoded on its way to the clipboard).
+    The file is only rewritten if it has CRLFs or leading whitespace; trailing whitespace is truncated in place.
+    """
+    with open(path, "rb") as f:
+        rewrite = f.read(1).isspace()
+        tail = b""
+        while not rewrite and (chunk := f.read(FILE_CHUNK)):
+            rewrite = b"\r\n" in tail + chunk
+            tail = chunk[-1:]
+    if rewrite:
+        tmp = f"{path}.tmp"
+        with open(path, "rb") as src, open(tmp, "wb") as dst:
+            started = False
+            carry = b""
+            while chunk := src.read(FILE_CHUNK):
+                chunk = carry + chunk
+                carry = b"\r" if chunk.endswith(b"\r") else b""  # may be the start of a CRLF
+                chunk = chunk[: len(chunk) - len(carry)].replace(b"\r\n", b"\n")
+                if not started:
+                    chunk = chunk.lstrip()
+                    started = bool(chunk)
+                dst.write(chunk)
+            dst.write(carry)
+        os.replace(tmp, path)
+    with open(path, "r+b") as f:
+        end = f.seek(0, os.SEEK_END)
+        while end > 0:
+            start = max(end - FILE_CHUNK, 0)
+            f.seek(start)
+            kept = len(f.read(end - start).rstrip())
+            if kept:
+                end = start + kept
+                break
+            end = start
+        f.truncate(end)
+
+
+def _line_command(template: str, line: str) -> str:
+    """`{}` in the template is replaced by the quoted line, otherwise the line is appended (like xargs)."""
+    quoted = subprocess.list2cmdline([line]) if sys.platform == "win32" else shlex.quote(line)
+    if "{}" in template:
+        return template.replace("{}", quoted)
+    return f"{template} {quoted}"
+
+
+class CmdWorker(Thread):
+    finished = pyqtSignal(str)
+    finished_file = pyqtSignal(str)  # path of the successful output (execute mode only)
+    error = pyqtSignal(str)
+    progress = pyqtSignal(str)  # partial output while the command runs (preview mode only)
+
+    PROGRESS_INTERVAL = 0.1  # seconds between progress updates
+
+    def __init__(
+        self,
+        cmd: str,
+        input_text: Optional[str],
+        shell_exec: str,
+        flag: str,
+        timeout: Optional[int] = None,
+        preview_bytes: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        warm_shell: Optional[WarmShell] = None,
+        stdin_file_bytes: Optional[int] = None,
+        spill_bytes: Optional[int] = None,
+    ):
+        """
+        Args:
+            preview_bytes: Preview mode: stream the output, keeping only its first and last `preview_bytes` bytes.
+            max_bytes: Execute mode: keep the full output, failing if it is longer than `max_bytes`.
+            spill_bytes: Execute mode: stream an output longer than this to a temp file.
+                         A successful output is always delivered as a file, by `finished_file`.
+            warm_shell: Run the command in this persistent shell instead of a new process
+                        (falls back to a new process if the warm shell fails).
+            stdin_file_bytes: Pass a selection larger than this as a file (memfd) instead of a pipe.
+        """
+        super().__init__()
+        self.cmd = cmd
+        self.input_text = input_text
+        self.shell_exec = shell_exec
+        self.shell_flag = flag
+        self.timeout = timeout
+        self.streaming = preview_bytes is not None
+        self.stdout = OutputBuffer(preview_bytes, max_bytes, spill_bytes)
+        # stderr always stays in memory
+        stderr_max = min(max_bytes, spill_bytes) if max_bytes and spill_bytes else max_bytes
+        self.stderr = OutputBuffer(preview_bytes, stderr_max)
+        self.warm_shell = warm_shell
+        self.stdin_file_bytes = stdin_file_bytes
+        self.proc: Optional[subprocess.Popen] = None
+        self.argv: Optional[list[str]] = None
+        self._kill: Optional[Callable[[], None]] = None
+        self._stopped = False
+        self._timed_out = False
+
+    def run(self):
+        try:
+            returncode = None
+            self.argv = direct_argv(self.cmd)
+            # a simple command is cheaper to exec directly than through the warm shell
+            if self.warm_shell is not None and self.argv is None:
+                try:
+                    returncode = self._run_warm(self.warm_shell)
+                except WarmShellError as e:
+                    if self._stopped or self._timed_out:
+                        returncode = -1
+                    else:
+                        print(f"CMD: {e}, falling back to a new process", file=sys.stderr)
+                        self.stdout.discard()
+                        self.stdout = OutputBuffer(
+                            self.stdout.preview_bytes, self.stdout.max_bytes, self.stdout.spill_bytes
+                        )
+                        self.stderr = OutputBuffer(self.stderr.preview_bytes, self.stderr.max_bytes)
+            if returncode is None:
+                returncode = self._run_process()
+            self.stdout.close_spill()
+
+            if self._stopped:
+                self.error.emit("Command cancelled by plugin")
+                return
+            if self._timed_out:
+                self.error.emit(f"Timeout ({self.timeout}s)")
+                return
+            if self.stdout.truncated or self.stderr.truncated:
+                self.error.emit(
+                    f"Output too large (over {self.stdout.max_bytes} bytes), not copied"
+                )
+                return
+
+            if self.stdout.spill_bytes is not None and returncode == 0:
+                # execute mode: the result is always handed over as bytes in a file (see _finish_spilled),
+                # so a small output is copied exactly like a large one (no decoding, same cleanup)
+                self.stdout.spill()
+            if self.stdout.spill_path:
+                self._finish_spilled(returncode)
+                return
+            stdout = _clean(self.stdout.getvalue())
+            stderr = _clean(self.stderr.getvalue())
+            if returncode != 0:
+                msg = f"Exit {returncode}: {stderr or stdout or 'Unknown error'}"
+                self.error.emit(msg)
+            else:
+                out = stdout
+                if stderr:
+                    out += f"\n[stderr]\n{stderr}"
+                self.finished.emit(out)
+        except FileNotFoundError:
+            self.error.emit(f"Shell not found: {self.shell_exec}")
+        except Exception as e:
+            self.error.emit(f"Execution error: {e}")
+        finally:
+            self.stdout.discard()  # unless it was handed over by _finish_spilled
+
+    def _finish_spilled(self, returncode: int):
+        stderr = _clean(self.stderr.getvalue())
+        if returncode != 0:
+            self.error.emit(f"Exit {returncode}: {stderr or 'Unknown error'}")
+            return
+        path = self.stdout.spill_path
+        _clean_file(path)
+        if stderr:
+            with open(path, "ab") as f:
+                f.write(f"\n[stderr]\n{stderr}".encode("utf-8"))
+        self.stdout.spill_path = None  # the receiver owns the file now
+        self.finished_file.emit(path)
+
+    def _run_process(self) -> int:
+        """Run the command in a new shell process, feeding stdin and reading the output on helper threads."""
+        data = (self.input_text or "").encode("utf-8")
+        stdin_file = None
+        if self.stdin_file_bytes and len(data) > self.stdin_file_bytes:
+            # a huge selection goes through a file: no feeder thread, and the command can seek/mmap it
+            stdin_file = _stdin_file(data)
+            data = b""
+        stdin = stdin_file if stdin_file is not None else subprocess.PIPE
+        try:
+            try:
+                proc = _build_process(self.cmd, self.shell_exec, self.shell_flag, self.argv, stdin)
+            except OSError:
+                if self.argv is None:
+                    raise
+                # the cached executable is gone (or not executable), let the shell handle it
+                forget(os.path.basename(self.argv[0]))
+                proc = _build_process(self.cmd, self.shell_exec, self.shell_flag, stdin=stdin)
+        finally:
+            if stdin_file is not None:
+                stdin_file.close()  # the child has its own descriptor
+        self.proc = proc
+        self._kill = lambda: _kill_tree(proc)
+        if self._stopped:  # stopped before the process existed
+            _kill_tree(proc)
+
+        readers = [
+            threading.Thread(target=_pump, args=(proc.stdout, self.stdout), daemon=True),
+            threading.Thread(target=_pump, args=(proc.stderr, self.stderr), daemon=True),
+        ]
+        if proc.stdin is not None:
+            threading.Thread(target=_feed_stdin, args=(proc, data), daemon=True).start()
+        for reader in readers:
+            reader.start()
+
+        self._follow(readers, lambda: proc.poll() is None)
+        return proc.wait()
+
+    def _run_warm(self, warm_shell: WarmShell) -> int:
+        """Run the command in the warm shell, on a helper thread."""
+        result = {}
+
+        def target():
+            try:
+                result["code"], stderr = warm_shell.run(
+                    self.cmd, self.input_text or "", self.stdout
+                )
+                self.stderr.write(stderr)
+            except Exception as e:
+                result["error"] = e
+
+        self._kill = warm_shell.kill
+        if self._stopped:
+            raise WarmShellError("Command cancelled")
+        runner = threading.Thread(target=target, daemon=True)
+        runner.start()
+        self._follow([runner], lambda: False)
+        if "error" in result:
+            raise result["error"]
+        return result.get("code", -1)
+
+    def _follow(self, threads: list[threading.Thread], alive: Callable[[], bool]):
+        """
+        Wait until the threads end and `alive()` is False, enforcing the timeout
+        and emitting throttled progress updates in preview mode.
+        """
+        deadline = time.monotonic() + self.timeout if self.timeout else None
+        shown = 0
+        while any(thread.is_alive() for thread in threads) or alive():
+            threads[0].join(self.PROGRESS_INTERVAL)
+            if deadline and not self._timed_out and time.monotonic() > deadline:
+                self._timed_out = True
+                if self._kill:
+                    self._kill()
+            if (self._stopped or self._timed_out) and not alive():
+                break  # do not wait for pipes kept open by orphaned children
+            if self.streaming and self.stdout.version != shown:
+                shown = self.stdout.version
+                self.progress.emit(_clean(self.stdout.getvalue()))
+
+    def stop(self):
+        self._stopped = True
+        # kill the process group, so run() returns right away
+        if self._kill:
+            self._kill()
+
+
+class ParallelWorker(Thread):
+    """
+    Per-line mode ($@): run the command template once for every non-empty line of the selection
+    (like `xargs -P`), on a pool of `jobs` threads, each one waiting on its own process.
+    The output is collected in input order, followed by the lines that failed and their exit codes.
+    """
+
+    finished = pyqtSignal(str)
+    error = pyqtSignal(str)
+    progress = pyqtSignal(str)
+
+    PROGRESS_INTERVAL = 0.1
+
+    def __init__(
+        self,
+        template: str,
+        input_text: Optional[str],
+        shell_exec: str,
+        flag: str,
+        timeout: Optional[int] = None,
+        jobs: Optional[int] = None,
+        preview_bytes: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+    ):
+        super().__init__()
+        self.template = template
+        self.lines = [line for line in (input_text or "").splitlines() if line.strip()]
+        self.shell_exec = shell_exec
+        self.shell_flag = flag
+        self.timeout = timeout
+        self.jobs = jobs or os.cpu_count() or 1
+        self.streaming = preview_bytes is not None
+        self.preview_bytes = preview_bytes
+        self.max_bytes = max_bytes
+        # index -> (exit code, stdout, stderr), filled by the pool threads
+        self.results: list[Optional[tuple[int, bytes, bytes]]] = [None] * len(self.lines)
+        self._procs: set[subprocess.Popen] = set()
+        self._lock = threading.Lock()
+        self._stopped = False
+        self._timed_out = False
+
+    def run(self):
+        try:
+            if not self.lines:
+                self.error.emit("No lines selected")
+                return
+            self._run_pool()
+
+            if self._stopped:
+                self.error.emit("Command cancelled by plugin")
+                return
+            if self._timed_out:
+                self.error.emit(f"Timeout ({self.timeout}s)")
+                return
+            out, failed, truncated = self._collect(final=True)
+            if truncated:
+                self.error.emit(f"Output too large (over {self.max_bytes} bytes), not copied")
+            elif len(failed) == len(self.lines):
+                self.error.emit(f"All {len(failed)} lines failed:\n" + "\n".join(failed))
+            else:
+                if failed:
+                    out += "\n[failed]\n" + "\n".join(failed)
+                self.finished.emit(out)
+        except FileNotFoundError:
+            self.error.emit(f"Shell not found: {self.shell_exec}")
+        except Exception as e:
+            self.error.emit(f"Execution error: {e}")
+
+    def _run_pool(self):
+        deadline = time.monotonic() + self.timeout if self.timeout else None
+        shown = -1
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            pending = {pool.submit(self._run_line, i) for i in range(len(self.lines))}
+            while pending:
+                done, pending = wait(pending, self.PROGRESS_INTERVAL, FIRST_COMPLETED)
+                for future in done:
+                    future.result()  # re-raise errors of the pool threads
+                if deadline and time.monotonic() > deadline:
+                    self._timed_out = True
+                if self._stopped or self._timed_out:
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    self._kill_all()
+                    return
+                finished = len(self.lines) - len(pending)
+                if self.streaming and finished != shown:
+                    shown = finished
+                    out, _, _ = self._collect(final=False)
+                    self.progress.emit(f"[{finished}/{len(self.lines)} lines done]\n{out}")
+
+    def _run_line(self, index: int):
+        if self._stopped or self._timed_out:
+            return
+        cmd = _line_command(self.template, self.lines[index])
+        argv = direct_argv(cmd)
+        try:
+            proc = _build_process(cmd, self.shell_exec, self.shell_flag, argv, subprocess.DEVNULL)
+        except OSError:
+            if argv is None:
+                raise
+            forget(os.path.basename(argv[0]))
+            proc = _build_process(cmd, self.shell_exec, self.shell_flag, stdin=subprocess.DEVNULL)
+        with self._lock:
+            self._procs.add(proc)
+        if self._stopped or self._timed_out:
+            _kill_tree(proc)
+        try:
+            stdout, stderr = proc.communicate()
+        finally:
+            with self._lock:
+                self._procs.discard(proc)
+        self.results[index] = (proc.returncode, stdout, stderr)
+
+    def _collect(self, final: bool) -> tuple[str, list[str], bool]:
+        """The output of the finished lines in input order (up to the first unfinished one, unless final)."""
+        buffer = OutputBuffer(self.preview_bytes, self.max_bytes)
+        failed = []
+        for line, result in zip(self.lines, self.results):
+            if result is None:
+                if final:
+                    continue
+                break
+            code, stdout, stderr = result
+            buffer.write(stdout if stdout.endswith(b"\n") or not stdout else stdout + b"\n")
+            if code != 0:
+                reason = _clean(stderr.decode("utf-8", errors="replace"))
+                failed.append(f"{line!r}: exit {code}" + (f": {reason}" if reason else ""))
+        return _clean(buffer.getvalue()), failed, buffer.truncated
+
+    def _kill_all(self):
+        with self._lock:
+            procs = list(self._procs)
+        for proc in procs:
+            _kill_tree(proc)
+
+    def stop(self):
+        self._stopped = True
+        self._kill_all()
+
+
+def _stop_worker(worker: Union[CmdWorker, ParallelWorker], wait_ms: int):
+    """Disconnect the worker from the UI, kill its process and wait for the thread to end."""
+    signals = [worker.finished, worker.error, worker.progress]
+    if isinstance(worker, CmdWorker):
+        signals.append(worker.finished_file)
+    for sig in signals:
+        try:
+            sig.disconnect()
+        except TypeError:
+            pass  # nothing connected
+    if worker.isRunning():
+        worker.stop()
+        if not worker.wait(wait_ms):
+            worker.terminate()
+            worker.wait()
+
+
+class CmdPlugin(PluginInterface):
+    NAME = "CMD"
+    PREFIX = "$"
+    IS_DEFAULT = False
+    PRIORITY = 10
+    HAS_AUTOCOMPLETE = True
+    COMPLETION_WORD_RE = re.compile(r"([\w.+-]+)$")
+
+    def __init__(self, api_instance, settings):  # Corrected type hint
+        super().__init__(api_instance, settings)
+        self.worker: Optional[Union[CmdWorker, ParallelWorker]] = None
+        self.exec_worker: Optional[Union[CmdWorker, ParallelWorker]] = None
+        self.current_preview = ""
+        self.auto_preview = False
+        self.per_line = False
+        self.warm_shell: Optional[WarmShell] = None
+        self.preview_cache: Optional[PreviewCache] = None
+        self._exec_started = 0.0
+        self._elapsed_timer = QTimer()
+        self._elapsed_timer.timeout.connect(self._show_elapsed)
+        self.path_index = PathIndex()
+        self.path_index.refresh_async()
+
+    def get_status_message(self) -> str:
+        if self.auto_preview:
+            return "CMD Auto-Preview Active ($$). Use with caution!"
+        if self.per_line:
+            return "CMD Per-Line Mode ($@): runs the command for each line, '{}' is the line (preview with Ctrl+Enter)."
+        return "CMD Mode: Use '$' (preview with Ctrl+Enter), '$$' (auto-preview) or '$@' (per line)."
+
+    def update_preview(self, command: str, selected_text: str, manual: bool) -> None:
+        self.auto_preview = command.startswith("$$")
+        self.per_line = command.startswith("$@")
+        if self.auto_preview or self.per_line:  # $$ or $@
+            cmd = command[2:].strip()
+        else:
+            cmd = command[1:].strip()
+        if not (manual or self.auto_preview):
+            if cmd != self.current_preview:
+                self.api.update_preview_content("")
+            self.api.reset_status()
+            return
+
+        if not cmd:
+            self.api.update_preview_content("")
+            self.api.set_status("Enter a command after '$'", self.NAME)
+            self._cleanup_worker()
+            self.current_preview = ""
+            return
+
+        # Avoid re-running the same preview command unnecessarily unless forced manually
+        if (
+            cmd == self.current_preview
+            and not manual
+            and self.worker
+            and self.worker.isRunning()
+        ):
+            return
+
+        self.current_preview = cmd
+        self._cleanup_worker()  # Stop previous worker if any
+
+        shell = self.settings.cmd_plugin.shell_executable
+        flag = self.settings.cmd_plugin.shell_flag
+        timeout = self.settings.cmd_plugin.timeout
+
+        # a previously seen (command, selection) pair shows up instantly
+        cache = self._get_preview_cache()
+        cache_key = None
+        if cache and not self.per_line and is_pure(cmd, self.settings.cmd_plugin.impure_commands or []):
+            cache_key = cache.key(cmd, shell, selected_text)
+            cached = cache.get(cache_key)
+            if cached is not None:
+                self.api.update_preview_content(cached)
+                self.api.set_status("✅ Preview updated (cached).", self.NAME)
+                return
+
+        self.api.update_preview_content("Executing command for preview...")
+        self.api.set_status("⏳ Running command for preview...", self.NAME)
+
+        if self.per_line:
+            self.worker = ParallelWorker(
+                cmd,
+                selected_text,
+                shell,
+                flag,
+                timeout,
+                jobs=self.settings.cmd_plugin.parallel_jobs,
+                preview_bytes=self.settings.cmd_plugin.preview_chars,
+            )
+        else:
+            self.worker = CmdWorker(
+                cmd,
+                selected_text,
+                shell,
+                flag,
+                timeout,
+                preview_bytes=self.settings.cmd_plugin.preview_chars,
+                warm_shell=self._get_warm_shell() if self.auto_preview else None,
+                stdin_file_bytes=self._stdin_file_bytes(),
+            )
+        self.worker.progress.connect(lambda out: self.api.update_preview_content(out))
+        self.worker.progress.connect(
+            lambda: self.api.set_status("⏳ Running (streaming output)...", self.NAME)
+        )
+        self.worker.finished.connect(lambda out: self.api.update_preview_content(out))
+        self.worker.finished.connect(
+            lambda: self.api.set_status("✅ Preview updated.", self.NAME)
+        )
+        if cache_key is not None:
+            # only successful runs are stored, errors may be transient
+            self.worker.finished.connect(lambda out: cache.put(cache_key, out))
+        self.worker.error.connect(
+            lambda err_msg: self.api.update_preview_content(err_msg)
+        )
+        self.worker.error.connect(
+            lambda err_msg: self.api.set_status(
+                f"❌ Preview error: {err_msg[:30]}...", self.NAME
+            )
+        )
+        self.worker.start()
+
+    def _stdin_file_bytes(self) -> Optional[int]:
+        mb = self.settings.cmd_plugin.stdin_file_mb
+        return mb * 1024 * 1024 if mb > 0 else None
+
+    def _get_warm_shell(self) -> Optional[WarmShell]:
+        shell = self.settings.cmd_plugin.shell_executable
+        if not (self.settings.cmd_plugin.warm_shell and WarmShell.supports(shell)):
+            self._close_warm_shell()
+            return None
+        if self.warm_shell is None or self.warm_shell.shell_exec != shell:
+            self._close_warm_shell()
+            self.warm_shell = WarmShell(shell)
+        return self.warm_shell
+
+    def _get_preview_cache(self) -> Optional[PreviewCache]:
+        cfg = self.settings.cmd_plugin
+        if not cfg.preview_cache:
+            self.preview_cache = None
+            return None
+        max_bytes = cfg.preview_cache_mb * 1024 * 1024
+        if self.preview_cache is None:
+            self.preview_cache = PreviewCache(cfg.preview_cache_ttl, max_bytes)
+        else:  # settings may have been reloaded
+            self.preview_cache.ttl = cfg.preview_cache_ttl
+            self.preview_cache.max_bytes = max_bytes
+        return self.preview_cache
+
+    def _close_warm_shell(self):
+        if self.warm_shell is not None:
+            self.warm_shell.close()
+            self.warm_shell = None
+
+    def on_window_show(self) -> None:
+        # only the PATH directories whose mtime changed are rescanned
+        self.path_index.refresh_async()
+
+    def update_completions(self, command: str, cursor_pos: int) -> None:
+        """Complete command names (from the PATH index) and common flags. No filesystem access."""
+        text = command[:cursor_pos]
+        for prefix in ("$$", "$@", "$"):
+            if text.startswith(prefix):
+                text = text[len(prefix) :]
+                break
+        word, completions = complete_command(self.path_index, text)
+
+        model = self.api.get_completion_model()
+        if completions and completions != [word]:
+            model.setStringList(completions)
+            self.api.get_completer().setCompletionPrefix(word)
+            self.api.show_completion_popup()
+        else:
+            model.setStringList([])
+            self.api.hide_completion_popup()
+
+    def execute(self, command: str, selected_text: str) -> Optional[str]:
+        # the window strips the "$" prefix: "$@cmd" arrives as "@cmd", and "$$cmd" as "$cmd"
+        per_line = command.startswith("@")
+        cmd = command[1:].strip() if per_line else command.lstrip("$").strip()
+        if not cmd:
+            self.api.set_status("No command to execute", self.NAME)
+            return None
+
+        self._cleanup_worker()
+        self._cleanup_exec_worker()
+
+        timeout = self.settings.cmd_plugin.timeout
+        shell = self.settings.cmd_plugin.shell_executable
+        flag = self.settings.cmd_plugin.shell_flag
+
+        # run on a worker thread, so the window (and Escape) stays responsive.
+        # the result is delivered asynchronously through api.close()
+        cfg = self.settings.cmd_plugin
+        max_bytes = cfg.output_max_mb * 1024 * 1024
+        if per_line:
+            worker = ParallelWorker(
+                cmd,
+                selected_text,
+                shell,
+                flag,
+                timeout,
+                jobs=self.settings.cmd_plugin.parallel_jobs,
+                max_bytes=max_bytes,
+            )
+        else:
+            worker = CmdWorker(
+                cmd,
+                selected_text,
+                shell,
+                flag,
+                timeout,
+                max_bytes=cfg.output_file_max_mb * 1024 * 1024,
+                stdin_file_bytes=self._stdin_file_bytes(),
+                spill_bytes=cfg.spill_mb * 1024 * 1024,
+            )
+            worker.finished_file.connect(self._on_execute_file)
+        worker.finished.connect(self._on_execute_done)
+        worker.error.connect(self._on_execute_error)
+        self.exec_worker = worker
+        self.active_workers.append(worker)
+
+        self._exec_started = time.monotonic()
+        self._show_elapsed()
+        self._elapsed_timer.start(200)
+        worker.start()
+        return None
+
+    def _show_elapsed(self):
+        elapsed = time.monotonic() - self._exec_started
+        self.api.set_status(f"⌛ Executing... {elapsed:.1f}s (Esc to cancel)", self.NAME)
+
+    def _on_execute_done(self, out: str):
+        self._cleanup_exec_worker()
+        self.api.close(copy_and_close_text=out)
+
+    def _on_execute_file(self, path: str):
+        self._cleanup_exec_worker()
+        self.api.close_with_file(path, self.settings.cmd_plugin.output_max_mb * 1024 * 1024)
+
+    def _on_execute_error(self, msg: str):
+        self._cleanup_exec_worker()
+        self.api.update_preview_content(msg)
+        self.api.set_status(msg, self.NAME)
+
+    def cancel(self) -> bool:
+        if not (self.exec_worker and self.exec_worker.isRunning()):
+            return False
+        self._cleanup_exec_worker()
+        self.api.set_status("🛑 Command cancelled", self.NAME)
+        return True
+
+    def on_deactivate(self) -> None:
+        # the window was dismissed (or the input left CMD mode): a command still running
+        # must not copy its result to the clipboard later, nor write to another plugin's preview
+        self._cleanup_worker()
+        self._cleanup_exec_worker()
+
+    def _cleanup_worker(self):
+        # a superseded preview is killed right away (with its process group)
+        if self.worker:
+            _stop_worker(self.worker, 500)
+        self.worker = None
+
+    def _cleanup_exec_worker(self):
+        self._elapsed_timer.stop()
+        worker = self.exec_worker
+        self.exec_worker = None
+        if worker is None:
+            return
+        # a cancelled command must not close the window with its result
+        _stop_worker(worker, 1000)
+        if worker in self.active_workers:
+            self.active_workers.remove(worker)
+
+    def cleanup(self):
+        self._cleanup_worker()
+        self._cleanup_exec_worker()
+        self._close_warm_shell()
+        if self.preview_cache:
+            self.preview_cache.clear()
+        super().cleanup()
+
+    def register_settings(self, settings_manager):
+        section = settings_manager.section("cmd_plugin")
+        dshell, dflag = get_default_shell()
+
+        section.add(
+            name="timeout",
+            default=15,
+            type_=int,
+            description="Timeout in seconds for commands and previews",
+        )
+        section.add(
+            name="shell_executable",
+            default=dshell,
+            type_=str,
+            description="Shell to run commands (uses '-c')",
+        )
+        section.add(
+            name="shell_flag",
+            default=dflag,
+            type_=str,
+            description="Flag to pass a command to the shell (e.g., -c for bash, /c for cmd)",
+        )
+        section.add(
+            name="warm_shell",
+            default=False,
+            type_=bool,
+            description="Run auto-preview ($$) commands in a persistent shell, to skip the shell startup (POSIX shells only). The selection is stored in a private temp file",
+        )
+        section.add(
+            name="preview_chars",
+            default=20000,
+            type_=int,
+            description="Preview keeps only the first and last N bytes of the output",
+        )
+        section.add(
+            name="output_max_mb",
+            default=64,
+            type_=int,
+            description="Largest output (MB) copied to the clipboard. A larger output is saved to a file, and its path is copied instead",
+        )
+        section.add(
+            name="spill_mb",
+            default=16,
+            type_=int,
+            description="Output larger than this (MB) is written to a temporary file instead of memory",
+        )
+        section.add(
+            name="output_file_max_mb",
+            default=4096,
+            type_=int,
+            description="Maximum output size (MB) of an executed command",
+        )
+        section.add(
+            name="stdin_file_mb",
+            default=32,
+            type_=int,
+            description="Pass selections larger than this (MB) to commands as a file (memfd on Linux) instead of a pipe. 0 to always use a pipe",
+        )
+        section.add(
+            name="parallel_jobs",
+            default=0,
+            type_=int,
+            description="Number of commands run at once in per-line mode ($@). 0 for the number of CPUs",
+        )
+        section.add(
+            name="preview_cache",
+            default=False,
+            type_=bool,
+            description="Reuse the preview output of a command already run on the same selection (only for commands assumed to be idempotent)",
+        )
+        section.add(
+            name="preview_cache_ttl",
+            default=300,
+            type_=int,
+            description="Seconds a cached preview stays valid",
+        )
+        section.add(
+            name="preview_cache_mb",
+            default=16,
+            type_=int,
+            description="Maximum size (MB) of the preview cache",
+        )
+        section.add(
+            name="impure_commands",
+            default=DEFAULT_IMPURE,
+            type_=list,
+            description="Commands (or variables) whose previews are never cached, because their output changes or they have side effects",
+        )
+
+
+# TODO: get default shell with default arguments (on windows, no way for "cmd -c 'command'"). make the argument configerable too.
@@ -0,0 +1,61 @@
+import os
+import shlex
+import shutil
+import sys
+from typing import Optional
+
+"""
+fast path for simple commands: `cut -f1` does not need a shell, so exec the program directly
+instead of `$SHELL -c "cut -f1"` (one fork/exec instead of two, and no shell startup).
+"""
+
+# anything the shell would expand or interpret. quotes are fine, shlex handles them like sh does
+SHELL_METACHARS = set("|&;<>()$`\\*?[]{}~#\n")
+
+# builtins and keywords: these must run in the shell (some exist as programs too, but behave differently)
+SHELL_BUILTINS = {
+    ".", ":", "[", "alias", "bg", "break", "builtin", "case", "cd", "command", "continue",
+    "declare", "echo", "eval", "exec", "exit", "export", "false", "fc", "fg", "for",
+    "function", "getopts", "hash", "history", "if", "jobs", "kill", "let", "local",
+    "printf", "pwd", "read", "readonly", "return", "select", "set", "shift", "source",
+    "test", "time", "times", "trap", "true", "type", "typeset", "ulimit", "umask",
+    "unalias", "unset", "until", "wait", "while",
+}
+
+# (PATH, name) -> resolved executable. keyed on PATH, so a changed PATH never uses stale entries
+_which_cache: dict[tuple[str, str], Optional[str]] = {}
+
+
+def which(name: str) -> Optional[str]:
+    path = os.environ.get("PATH", os.defpath)
+    key = (path, name)
+    if key not in _which_cache:
+        _which_cache[key] = shutil.which(name, path=path)
+    return _which_cache[key]
+
+
+def forget(name: str) -> None:
+    """Drop a cached resolution (e.g. the executable was removed)."""
+    path = os.environ.get("PATH", os.defpath)
+    _which_cache.pop((path, name), None)
+
+
+def direct_argv(cmd: str) -> Optional[list[str]]:
+    """
+    Return the argv to exec `cmd` without a shell, or None if it needs the shell
+    (metacharacters, builtins, variable assignments, unknown program, or Windows).
+    """
+    if sys.platform == "win32" or SHELL_METACHARS.intersection(cmd):
+        return None
+    try:
+        argv = shlex.split(cmd)
+    except ValueError:  # e.g. unbalanced quotes, let the shell report it
+        return None
+    if not argv or argv[0] in SHELL_BUILTINS or "=" in argv[0]:
+        return None
+    if os.sep in argv[0]:
+        return argv  # explicit path, exec it as is
+    executable = which(argv[0])
+    if executable is None:
+        return None  # the shell gives a better "command not found"
+    return [executable] + argv[1:]
@@ -0,0 +1,130 @@
+import codecs
+import os
+import tempfile
+import threading
+from collections import deque
+from typing import Optional
+
+
+class OutputBuffer:
+    """
+    Thread-safe collector for process output, as raw bytes (decoded only by getvalue()).
+
+    In preview mode (`preview_bytes` set) only the first and the last `preview_bytes` bytes
+    are kept (the tail is a ring buffer), so a huge output never sits in memory.
+    Otherwise everything is kept up to `max_bytes`, after which `truncated` is set.
+    Once the output grows over `spill_bytes`, it is streamed to a temporary file (`spill_path`) instead of memory.
+    """
+
+    def __init__(
+        self,
+        preview_bytes: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        spill_bytes: Optional[int] = None,
+    ):
+        self.preview_bytes = preview_bytes
+        self.max_bytes = max_bytes
+        self.spill_bytes = spill_bytes
+        self.spill_path: Optional[str] = None
+        self._spill_file = None
+        self.total = 0  # bytes written, including the dropped ones
+        self.truncated = False
+        self._head: list[bytes] = []
+        self._head_len = 0
+        self._tail: deque[bytes] = deque()
+        self._tail_len = 0
+        self._lock = threading.Lock()
+        self._version = 0  # bumped on every write, to know if the preview changed
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def write(self, data: bytes) -> None:
+        if not data:
+            return
+        with self._lock:
+            self.total += len(data)
+            self._version += 1
+            if self.preview_bytes is None:
+                if self.max_bytes is not None and self._head_len + len(data) > self.max_bytes:
+                    data = data[: self.max_bytes - self._head_len]
+                    self.truncated = True
+                if (
+                    self._spill_file is None
+                    and self.spill_bytes is not None
+                    and self._head_len + len(data) > self.spill_bytes
+                ):
+                    self._spill()
+                if self._spill_file is not None:
+                    self._spill_file.write(data)
+                else:
+                    self._head.append(data)
+                self._head_len += len(data)
+                return
+
+            room = self.preview_bytes - self._head_len
+            if room > 0:
+                self._head.append(data[:room])
+                self._head_len += min(room, len(data))
+                data = data[room:]
+            if not data:
+                return
+
+            self._tail.append(data)
+            self._tail_len += len(data)
+            while self._tail_len > self.preview_bytes:
+                extra = self._tail_len - self.preview_bytes
+                first = self._tail[0]
+                if len(first) <= extra:
+                    self._tail.popleft()
+                    self._tail_len -= len(first)
+                else:
+                    self._tail[0] = first[extra:]
+                    self._tail_len -= extra
+
+    def _spill(self):
+        self._spill_file = tempfile.NamedTemporaryFile(prefix="f7-output-", suffix=".txt", delete=False)
+        self.spill_path = self._spill_file.name
+        self._spill_file.writelines(self._head)
+        self._head = []
+
+    def spill(self) -> None:
+        """Move the output kept in memory to the spill file (if it is not there yet), and close it."""
+        with self._lock:
+            if self._spill_file is None:
+                self._spill()
+        self.close_spill()
+
+    def close_spill(self) -> None:
+        """Flush and close the spill file (it is kept on disk)."""
+        with self._lock:
+            if self._spill_file is not None:
+                self._spill_file.close()
+
+    def discard(self) -> None:
+        """Drop the spilled output, if any."""
+        self.close_spill()
+        if self.spill_path:
+            try:
+                os.unlink(self.spill_path)
+            except OSError:
+                pass
+            self.spill_path = None
+
+    def getvalue(self) -> str:
+        with self._lock:
+            head = b"".join(self._head)
+            if not self._tail:
+                return head.decode("utf-8", errors="replace")
+            tail = b"".join(self._tail)
+            skipped = self.total - self._head_len - self._tail_len
+        if skipped <= 0:
+            return (head + tail).decode("utf-8", errors="replace")
+        # the cuts can fall inside a multibyte character: drop the partial sequences
+        head_text, _ = codecs.utf_8_decode(head, "replace", False)
+        cut = 0
+        while cut < min(3, len(tail)) and 0x80 <= tail[cut] < 0xC0:
+            cut += 1
+        tail_text = tail[cut:].decode("utf-8", errors="replace")
+        return f"{head_text}\n… [{skipped} bytes skipped] …\n{tail_text}"
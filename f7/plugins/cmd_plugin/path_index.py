@@ -0,0 +1,119 @@
+import bisect
+import os
+import re
+import sys
+import threading
+
+"""
+index of the executables on PATH, for $-mode completion.
+the index is (re)built on a background thread, rescanning only the directories whose mtime changed,
+so a completion lookup is a bisect on a sorted list and never touches the filesystem.
+"""
+
+# flags worth suggesting for common text tools
+COMMON_FLAGS: dict[str, list[str]] = {
+    "awk": ["-F", "-v", "-f"],
+    "base64": ["-d", "-w"],
+    "column": ["-t", "-s", "-o"],
+    "cut": ["-d", "-f", "-c", "-b", "--complement", "--output-delimiter"],
+    "grep": ["-i", "-v", "-c", "-n", "-o", "-E", "-F", "-P", "-w", "-x", "-l", "-A", "-B", "-C", "--color"],
+    "head": ["-n", "-c"],
+    "jq": ["-r", "-c", "-s", "-S", "-e", "--arg", "--tab"],
+    "nl": ["-b", "-s", "-w"],
+    "paste": ["-d", "-s"],
+    "rg": ["-i", "-v", "-c", "-n", "-o", "-w", "-F", "-r", "--color"],
+    "sed": ["-n", "-e", "-E", "-r", "-z"],
+    "sort": ["-n", "-r", "-u", "-k", "-t", "-h", "-V", "-f", "-s", "-R"],
+    "tail": ["-n", "-c", "-r"],
+    "tr": ["-d", "-s", "-c"],
+    "uniq": ["-c", "-d", "-u", "-i", "-f"],
+    "wc": ["-l", "-w", "-c", "-m", "-L"],
+    "xargs": ["-n", "-I", "-P", "-0", "-d"],
+}
+
+# start of a command: the beginning of the input, or after a pipe, `;`, `&&`, `||`, `(` or `$(`
+_COMMAND_POSITION_RE = re.compile(r"(?:^|[|;&(])\s*$")
+_SEGMENT_SPLIT_RE = re.compile(r"[|;&(]")
+_WORD_RE = re.compile(r"([^\s|;&()<>]*)$")
+
+
+def _is_executable(entry: os.DirEntry, pathext: tuple[str, ...]) -> bool:
+    try:
+        if not entry.is_file():
+            return False
+    except OSError:
+        return False
+    if sys.platform == "win32":
+        return entry.name.lower().endswith(pathext)
+    return os.access(entry.path, os.X_OK)
+
+
+class PathIndex:
+    def __init__(self):
+        self._names: list[str] = []  # sorted, unique
+        self._dirs: dict[str, tuple[float, list[str]]] = {}  # dir -> (mtime, executables)
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    def refresh_async(self) -> None:
+        """Rebuild the index in the background (no-op if a refresh is already running)."""
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._refresh, name="f7-path-index", daemon=True)
+            self._thread.start()
+
+    def _refresh(self) -> None:
+        pathext = tuple(
+            ext.lower() for ext in os.environ.get("PATHEXT", ".EXE;.BAT;.CMD").split(";") if ext
+        )
+        dirs: dict[str, tuple[float, list[str]]] = {}
+        for directory in os.environ.get("PATH", os.defpath).split(os.pathsep):
+            if not directory or directory in dirs:
+                continue
+            try:
+                mtime = os.stat(directory).st_mtime
+            except OSError:
+                continue
+            cached = self._dirs.get(directory)
+            if cached and cached[0] == mtime:
+                dirs[directory] = cached
+                continue
+            try:
+                with os.scandir(directory) as entries:
+                    names = [e.name for e in entries if _is_executable(e, pathext)]
+            except OSError:
+                continue
+            if sys.platform == "win32":
+                names = [os.path.splitext(name)[0] for name in names]
+            dirs[directory] = (mtime, names)
+
+        self._dirs = dirs
+        # swapped in one assignment, so readers always see a complete list
+        self._names = sorted({name for _, names in dirs.values() for name in names})
+
+    def complete(self, prefix: str, limit: int = 200) -> list[str]:
+        names = self._names
+        start = bisect.bisect_left(names, prefix)
+        end = min(bisect.bisect_left(names, prefix + "\U0010ffff", start), start + limit)
+        return names[start:end]
+
+
+def complete_command(index: PathIndex, text: str) -> tuple[str, list[str]]:
+    """
+    Completions for the shell word ending `text`: command names at a command position,
+    common flags after a known command.
+
+    Returns:
+        The word being completed and its completions.
+    """
+    word = _WORD_RE.search(text).group(1)
+    before = text[: len(text) - len(word)]
+    if _COMMAND_POSITION_RE.search(before):
+        return word, index.complete(word) if word else []
+    if word.startswith("-"):
+        segment = _SEGMENT_SPLIT_RE.split(before)[-1].split()
+        if segment:
+            program = os.path.basename(segment[0])
+            return word, [flag for flag in COMMON_FLAGS.get(program, []) if flag.startswith(word)]
+    return word, []
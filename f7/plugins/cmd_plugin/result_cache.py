@@ -0,0 +1,78 @@
+import hashlib
+import os
+import re
+import time
+from collections import OrderedDict
+from typing import Optional
+
+# commands whose output changes between runs, or that have side effects
+DEFAULT_IMPURE = [
+    "date", "curl", "wget", "rm", "mv", "cp", "dd", "touch", "mkdir", "rmdir", "ln",
+    "tee", "ssh", "scp", "rsync", "kill", "pkill", "shuf", "uuidgen", "mktemp",
+    "sleep", "ps", "top", "free", "uptime", "nc", "git", "RANDOM", "SECONDS",
+]
+
+_WORD_SPLIT_RE = re.compile(r"[\s|&;()<>`$\"'{}]+")
+
+
+def is_pure(cmd: str, impure: list[str]) -> bool:
+    """False if any word of the command (or its basename, e.g. /bin/rm) is in the denylist."""
+    denied = set(impure)
+    for word in _WORD_SPLIT_RE.split(cmd):
+        if word and (word in denied or os.path.basename(word) in denied):
+            return False
+    return True
+
+
+class PreviewCache:
+    """
+    LRU cache of preview outputs, keyed by (command, shell, selection digest).
+    Entries expire after `ttl` seconds, and the total size is capped by `max_bytes` (approximately, in characters).
+    """
+
+    def __init__(self, ttl: float, max_bytes: int):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[tuple, tuple[float, str]] = OrderedDict()
+        self._size = 0
+        self._digest_text: Optional[str] = None
+        self._digest = b""
+
+    def _selection_digest(self, text: str) -> bytes:
+        # hashing a big selection on every keystroke is wasteful, reuse the last digest
+        if not (text is self._digest_text or text == self._digest_text):
+            self._digest = hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+            self._digest_text = text
+        return self._digest
+
+    def key(self, cmd: str, shell: str, text: str) -> tuple:
+        return cmd, shell, self._selection_digest(text)
+
+    def get(self, key: tuple) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        stored_at, output = entry
+        if time.monotonic() - stored_at > self.ttl:
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return output
+
+    def put(self, key: tuple, output: str) -> None:
+        if len(output) > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (time.monotonic(), output)
+        self._size += len(output)
+        while self._size > self.max_bytes and self._entries:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: tuple) -> None:
+        _, output = self._entries.pop(key)
+        self._size -= len(output)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._size = 0
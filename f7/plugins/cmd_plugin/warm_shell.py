@@ -0,0 +1,125 @@
+import os
+import secrets
+import shlex
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+from typing import Optional
+
+from .output import OutputBuffer
+
+# shells that understand `( ... ) < file 2> file; printf ... $?`
+POSIX_SHELLS = {"sh", "bash", "zsh", "dash", "ksh", "mksh", "ash", "busybox"}
+
+
+class WarmShellError(RuntimeError):
+    pass
+
+
+class WarmShell:
+    """
+    A persistent shell coprocess for auto-preview ($$), so a preview does not pay the shell startup.
+
+    Each command runs in a subshell (state like `cd` does not leak), with the selection redirected
+    from a temp file and stderr to another one. The end of stdout is marked by a random sentinel line
+    followed by the exit code. If the coprocess dies or is killed (cancel/timeout), it is restarted
+    on the next command.
+    """
+
+    def __init__(self, shell_exec: str):
+        self.shell_exec = shell_exec
+        self.proc: Optional[subprocess.Popen] = None
+        self._dir = tempfile.mkdtemp(prefix="f7-shell-")  # private (0700)
+        self._input_path = os.path.join(self._dir, "selection")
+        self._stderr_path = os.path.join(self._dir, "stderr")
+        self._input_text: Optional[str] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def supports(shell_exec: str) -> bool:
+        return sys.platform != "win32" and os.path.basename(shell_exec) in POSIX_SHELLS
+
+    def _ensure_started(self):
+        if self.proc is None or self.proc.poll() is not None:
+            self.proc = subprocess.Popen(
+                [self.shell_exec],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                start_new_session=True,  # own process group, so kill() also stops running commands
+            )
+
+    def _set_input(self, text: str):
+        # the selection is written once, and reused by every preview of the same selection
+        if text is self._input_text or text == self._input_text:
+            return
+        with open(self._input_path, "wb") as f:
+            f.write(text.encode("utf-8"))
+        self._input_text = text
+
+    def run(self, cmd: str, text: str, out: OutputBuffer) -> tuple[int, bytes]:
+        """
+        Run `cmd` with `text` as stdin, streaming its stdout into `out`.
+        Blocking, call it from a worker thread.
+
+        Returns:
+            The exit code and the stderr of the command.
+        """
+        with self._lock:
+            self._set_input(text)
+            self._ensure_started()
+            assert self.proc and self.proc.stdin
+            sentinel = f"__F7_DONE_{secrets.token_hex(8)}__"
+            script = (
+                f"( eval {shlex.quote(cmd)} ) < {shlex.quote(self._input_path)}"
+                f" 2> {shlex.quote(self._stderr_path)}; printf '\\n%s %s\\n' {sentinel} $?\n"
+            )
+            try:
+                self.proc.stdin.write(script.encode("utf-8"))
+                self.proc.stdin.flush()
+            except OSError as e:
+                raise WarmShellError(f"Warm shell is not running: {e}")
+
+            returncode = self._read_until(sentinel, out)
+            with open(self._stderr_path, "rb") as f:
+                stderr = f.read()
+            return returncode, stderr
+
+    def _read_until(self, sentinel: str, out: OutputBuffer) -> int:
+        assert self.proc and self.proc.stdout
+        marker = f"\n{sentinel} ".encode()
+        fd = self.proc.stdout.fileno()
+        pending = b""
+        while True:
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                raise WarmShellError("Warm shell exited")
+            pending += chunk
+            index = pending.find(marker)
+            if index != -1:
+                rest = pending[index + len(marker) :]
+                if b"\n" not in rest:
+                    continue  # wait for the rest of the exit code line
+                out.write(pending[:index])
+                return int(rest.split(b"\n", 1)[0])
+            # hold back what could be the start of the marker
+            keep = len(marker)
+            out.write(pending[:-keep])
+            pending = pending[-keep:]
+
+    def kill(self):
+        """Kill the coprocess and whatever it runs. It is restarted on the next command."""
+        proc = self.proc
+        if proc and proc.poll() is None:
+            try:
+                os.killpg(proc.pid, signal.SIGKILL)
+            except OSError:
+                proc.kill()
+            proc.wait()
+
+    def close(self):
+        self.kill()
+        shutil.rmtree(self._dir, ignore_errors=True)
@@ -0,0 +1,127 @@
+import importlib
+import sys
+import time
+import types
+
+"""
+lazy proxies for the names in static_globals, so the tray process does not import modules
+(like string_utils or urllib) that are only needed once the user actually uses them.
+"""
+
+# name -> (module, seconds it took to import on first use)
+import_costs: dict[str, tuple[str, float]] = {}
+# every proxy created, by name (used by the import report)
+proxies: dict[str, "LazyModule | LazyAttr"] = {}
+# name -> module, for the names bound right away because their module was already imported
+eager: dict[str, str] = {}
+
+
+def _import(module_name: str, name: str):
+    start = time.perf_counter()
+    module = importlib.import_module(module_name)
+    import_costs.setdefault(name, (module_name, time.perf_counter() - start))
+    return module
+
+
+class LazyModule(types.ModuleType):
+    """A module placeholder that imports the real module on first attribute access."""
+
+    def __init__(self, name: str, module_name: str):
+        super().__init__(module_name)
+        self.__dict__["_lazy_name"] = name
+        self.__dict__["_lazy_module"] = None
+
+    def _resolve(self) -> types.ModuleType:
+        module = self.__dict__["_lazy_module"]
+        if module is None:
+            module = _import(self.__name__, self.__dict__["_lazy_name"])
+            self.__dict__["_lazy_module"] = module
+        return module
+
+    def __getattr__(self, attr):
+        # only called for attributes missing from the placeholder itself
+        return getattr(self._resolve(), attr)
+
+    def __dir__(self):
+        return dir(self._resolve())
+
+    def __repr__(self):
+        return repr(self._resolve())
+
+
+class LazyAttr:
+    """A placeholder for `from module import attr`, resolved on first use."""
+
+    __slots__ = ("_name", "_module_name", "_attr", "_target")
+
+    def __init__(self, name: str, module_name: str, attr: str):
+        self._name = name
+        self._module_name = module_name
+        self._attr = attr
+        self._target = None
+
+    def _resolve(self):
+        if self._target is None:
+            self._target = getattr(_import(self._module_name, self._name), self._attr)
+        return self._target
+
+    def __call__(self, *args, **kwargs):
+        return self._resolve()(*args, **kwargs)
+
+    def __getattr__(self, attr):
+        return getattr(self._resolve(), attr)
+
+    def __dir__(self):
+        return dir(self._resolve())
+
+    def __repr__(self):
+        return repr(self._resolve())
+
+    def __eq__(self, other):
+        return self._resolve() == other
+
+    def __hash__(self):
+        return hash(self._resolve())
+
+    # make `isinstance(x, datetime)` and `class X(Counter)` work with proxied classes
+    def __instancecheck__(self, obj):
+        return isinstance(obj, self._resolve())
+
+    def __subclasscheck__(self, cls):
+        return issubclass(cls, self._resolve())
+
+    def __mro_entries__(self, bases):
+        return (self._resolve(),)
+
+
+def lazy_module(module_name: str, name: str | None = None):
+    """`import module_name` on first use. Returns the module itself if it is already imported."""
+    if module_name in sys.modules:
+        eager[name or module_name] = module_name
+        return sys.modules[module_name]
+    proxy = proxies[name or module_name] = LazyModule(name or module_name, module_name)
+    return proxy
+
+
+def lazy_attrs(module_name: str, *attrs: str) -> list:
+    """`from module_name import attrs` on first use. Returns the real objects if the module is already imported."""
+    if module_name in sys.modules:
+        module = sys.modules[module_name]
+        eager.update(dict.fromkeys(attrs, module_name))
+        return [getattr(module, attr) for attr in attrs]
+    result = []
+    for attr in attrs:
+        proxy = proxies[attr] = LazyAttr(attr, module_name, attr)
+        result.append(proxy)
+    return result
+
+
+def import_report() -> list[tuple[str, str, float]]:
+    """
+    Resolve every lazy name and return (name, module, seconds) sorted by cost.
+    The first name of each module pays for the whole import, the others are ~0.
+    """
+    for name, proxy in proxies.items():
+        proxy._resolve()
+    report = [(name, module, cost) for name, (module, cost) in import_costs.items()]
+    return sorted(report, key=lambda row: row[2], reverse=True)
@@ -0,0 +1,202 @@
+import ast
+import io
+import sys
+import token
+import tokenize
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from scriptpy.smart_eval import balance_fix
+
+"""
+memoize the stages of scriptpy pipelines (`lines | str.upper | .strip()`), so while the user
+is typing the last stage, the earlier stages are not re-evaluated over the full selection.
+"""
+
+PIPE_VAR = "__f7_pipe__"
+
+# top-level nodes that bind looser than `|`. splitting them on `|` would change their meaning
+_LOOSE_NODES = (ast.Compare, ast.BoolOp, ast.IfExp, ast.Lambda, ast.NamedExpr)
+_IMMUTABLE = (str, bytes, int, float, complex, bool, type(None))
+
+
+def _is_attr_pipe(stage: str) -> bool:
+    """check that the stage is exactly `.name` or `.name(args)` (what scriptpy turns into `_apipe`)."""
+    try:
+        toks = [
+            t
+            for t in tokenize.generate_tokens(io.StringIO(stage).readline)
+            if t.type not in (token.NEWLINE, token.NL, token.ENDMARKER)
+        ]
+    except (tokenize.TokenError, IndentationError, SyntaxError):
+        return False
+    if len(toks) < 2 or toks[0].string != "." or toks[1].type != token.NAME:
+        return False
+    if len(toks) == 2:
+        return True
+    if toks[2].string != "(" or toks[-1].string != ")":
+        return False
+    depth = 0
+    for t in toks[2:-1]:
+        if t.string == "(":
+            depth += 1
+        elif t.string == ")":
+            depth -= 1
+            if depth == 0:  # the call closed before the end of the stage
+                return False
+    return True
+
+
+def _is_tight(stage: str, first: bool) -> bool:
+    """check that the stage is a single expression that binds tighter than `|`."""
+    if stage.startswith("."):
+        return not first and _is_attr_pipe(stage)
+    try:
+        node = ast.parse(stage, mode="eval").body
+    except SyntaxError:
+        return False
+    if isinstance(node, _LOOSE_NODES):
+        return False
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+        return False
+    return True
+
+
+def split_pipeline(command: str) -> Optional[list[str]]:
+    """
+    Split a command like `lines | str.upper | .strip()` into its stages.
+    Returns None if the command is not a plain left-to-right pipe chain
+    (or if it has side effects like walrus or `$(...)`), so it has to be evaluated as a whole.
+    """
+    src = balance_fix(command).strip()
+    if not src or "\n" in src:
+        return None
+    try:
+        toks = list(tokenize.generate_tokens(io.StringIO(src).readline))
+    except (tokenize.TokenError, IndentationError, SyntaxError):
+        return None
+
+    depth = 0
+    cuts = []
+    for tok in toks:
+        if tok.type == token.ERRORTOKEN and tok.string.strip():
+            return None  # e.g. scriptpy `$(cmd)`
+        if tok.type != token.OP:
+            continue
+        if tok.string == ":=":
+            return None
+        if tok.string in "([{":
+            depth += 1
+        elif tok.string in ")]}":
+            depth -= 1
+        elif depth == 0 and tok.string in (",", ";", ":"):
+            return None
+        elif depth == 0 and tok.string == "|":
+            cuts.append(tok.start[1])  # single line, so the column is the offset
+
+    if not cuts:
+        return None
+    bounds = [-1] + cuts + [len(src)]
+    stages = [src[a + 1 : b].strip() for a, b in zip(bounds, bounds[1:])]
+    if not all(_is_tight(stage, i == 0) for i, stage in enumerate(stages)):
+        return None
+    return stages
+
+
+def _estimate_size(value) -> Optional[int]:
+    """
+    Return the approximate memory size of a value that is safe to reuse between evaluations,
+    or None if it is not (iterators are consumed, mutable items can be changed by later stages).
+    """
+    if isinstance(value, _IMMUTABLE):
+        return sys.getsizeof(value)
+    if isinstance(value, (list, tuple, frozenset)):
+        size = sys.getsizeof(value)
+        for item in value:
+            if not isinstance(item, _IMMUTABLE):
+                return None
+            size += sys.getsizeof(item)
+        return size
+    return None
+
+
+class PipelineCache:
+    """
+    LRU cache of pipeline prefix results for the current selection.
+    Keys are the normalized prefix source (`stage0 | stage1`), values are the evaluated results.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._text: Optional[str] = None
+        self._entries: OrderedDict[str, tuple[object, int]] = OrderedDict()
+        self._size = 0
+
+    def clear(self):
+        self._entries.clear()
+        self._size = 0
+
+    def _reset_for(self, text: str):
+        # the cache is per selection: a new selection makes every entry stale
+        if text is not self._text and text != self._text:
+            self.clear()
+            self._text = text
+
+    def _get(self, key: str):
+        value, _ = self._entries[key]
+        self._entries.move_to_end(key)
+        # hand out a shallow copy, so the cached list is never mutated in place
+        return type(value)(value) if isinstance(value, list) else value
+
+    def _put(self, key: str, value, size: int):
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._size -= self._entries.pop(key)[1]
+        self._entries[key] = (value, size)
+        self._size += size
+        while self._size > self.max_bytes and self._entries:
+            _, (_, old_size) = self._entries.popitem(last=False)
+            self._size -= old_size
+
+    def evaluate(
+        self,
+        stages: list[str],
+        text: str,
+        run: Callable[[str, dict], object],
+        has_output: Callable[[], bool],
+    ):
+        """
+        Evaluate the pipeline stages, starting from the longest cached prefix.
+
+        Args:
+            stages: the stages returned by `split_pipeline`.
+            text: the selected text the pipeline runs on.
+            run: evaluates a source string with extra variables, e.g. `run("x | f", {PIPE_VAR: x})`.
+            has_output: returns True if the evaluation printed something (printing stages are not cached,
+                        since replaying them from the cache would lose the output).
+        """
+        self._reset_for(text)
+
+        keys = [" | ".join(stages[: i + 1]) for i in range(len(stages))]
+        start = 0
+        value = None
+        for i in range(len(stages) - 1, 0, -1):
+            if keys[i - 1] in self._entries:
+                start = i
+                value = self._get(keys[i - 1])
+                break
+
+        cacheable = True
+        for i in range(start, len(stages)):
+            if i == 0:
+                value = run(stages[0], {})
+            else:
+                value = run(f"{PIPE_VAR} | {stages[i]}", {PIPE_VAR: value})
+
+            cacheable = cacheable and not has_output()
+            if cacheable and self.max_bytes > 0:
+                size = _estimate_size(value)
+                if size is not None:
+                    self._put(keys[i], value, size)
+        return value
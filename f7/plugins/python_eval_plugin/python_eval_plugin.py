@@ -2,18 +2,28 @@
 import builtins
 import contextlib
 import io
+import os
 import rlcompleter
 import sys
 
+from appdirs import user_config_dir
 from PyQt6.QtCore import QStringListModel
 from PyQt6.QtWidgets import QCompleter, QLabel, QTextEdit
-from scriptpy import custom_eval
 
 from ...utils import WORD_BOUNDARY_RE, dotdict
 from ..base_plugin import PluginInterface
 from .cyber import ctx as cyber_ctx
-from .python_utils import PyUtils, auto_parse, redirect_stdin, repr_as_json
+from .pipeline_cache import PipelineCache, split_pipeline
+from .python_utils import (
+    PyUtils,
+    auto_parse,
+    redirect_stdin,
+    repr_as_json,
+    run_scriptpy,
+    scriptpy_environment,
+)
 from .static_globals import static_globals
+from .user_helpers import UserHelpers
 
 
 class PythonEvalPlugin(PluginInterface):
@@ -27,11 +37,27 @@ class PythonEvalPlugin(PluginInterface):
 
     def __init__(self, api, settings):
         super().__init__(api, settings)
-        self.eval_context = self._create_context()
+        self.pipeline_cache = PipelineCache(0)  # limit is set from settings on use
+        self.user_helpers = UserHelpers()
+        # the context is layered: the base (builtins, static, cyber) is built once and never mutated,
+        # the selection layer is rebuilt only when the selection changes,
+        # and each evaluation runs in a throwaway copy, so assignments do not leak between evaluations.
+        # builtins are not copied: they are the namespace's `__builtins__`, looked up after its globals
+        self._builtins = dict(builtins.__dict__)
+        self.base_context = self._create_context()
+        self._selection_text: str | None = None
+        self._selection_layer: dict = {}
+        self.eval_context: dict = self.base_context  # base + selection + user helpers
 
     def get_status_message(self) -> str:
+        if self.user_helpers.error:
+            return f"🐍 Python mode (⚠️ helpers: {self.user_helpers.error})"
         return "🐍 Python mode"
 
+    def on_window_show(self) -> None:
+        # only stat the file here, the import is done lazily on first evaluation
+        self.user_helpers.check(self.settings.python_eval.helpers_file)
+
     def _evaluate(
         self, command: str, selected_text: str
     ) -> tuple[str | None, str | None]:
@@ -52,7 +78,7 @@ class PythonEvalPlugin(PluginInterface):
                 contextlib.redirect_stderr(combined_buf),
             ):
 
-                result = custom_eval(command, globals_=self.eval_context)
+                result = self._run_command(command, selected_text, combined_buf)
 
             output = combined_buf.getvalue()
             if result is None and output:
@@ -65,6 +91,24 @@ class PythonEvalPlugin(PluginInterface):
         except Exception as e:
             return None, f"🚨 Error: {str(e)}"
 
+    def _run_command(self, command: str, selected_text: str, output_buf: io.StringIO):
+        """Evaluate the command, reusing cached pipeline prefixes when possible."""
+        self.pipeline_cache.max_bytes = (
+            self.settings.python_eval.pipeline_cache_mb * 1024 * 1024
+        )
+        stages = split_pipeline(command) if self.pipeline_cache.max_bytes > 0 else None
+        if not stages:
+            return run_scriptpy(command, self._new_namespace())
+
+        def run(src: str, extra: dict):
+            namespace = self._new_namespace()
+            namespace.update(extra)
+            return run_scriptpy(src, namespace)
+
+        return self.pipeline_cache.evaluate(
+            stages, selected_text, run, lambda: output_buf.tell() > 0
+        )
+
     def update_preview(self, command: str, selected_text: str, manual: bool) -> None:
         """
         Update the preview area with the evaluation result or error.
@@ -110,13 +154,43 @@ class PythonEvalPlugin(PluginInterface):
             return None  # No command entered
 
     def _create_context(self):
-        ctx = dotdict(builtins.__dict__)
+        ctx = dotdict()
 
         ctx.update(static_globals)
         ctx.update(cyber_ctx)
+        ctx.update(scriptpy_environment())
+        # set last: static_globals is a module's globals(), whose __builtins__ is the live builtins module dict
+        ctx["__builtins__"] = self._builtins
         return ctx
 
     def _update_context(self, text: str):
+        """Rebuild the merged context, only if the selection or the user helpers changed."""
+        helpers_changed = self.user_helpers.load()
+        text_changed = not (text is self._selection_text or text == self._selection_text)
+        if text_changed:
+            self._selection_text = text
+            self._selection_layer = self._create_selection_layer(text)
+        elif not helpers_changed:
+            return
+
+        if helpers_changed:
+            self.pipeline_cache.clear()
+        ctx = dict(self.base_context)
+        ctx.update(self._selection_layer)
+        # user helpers win over the builtin ones
+        ctx.update(self.user_helpers.namespace)
+        self.eval_context = ctx
+
+    def _new_namespace(self) -> dict:
+        """A throwaway copy of the context for a single evaluation."""
+        namespace = self.eval_context.copy()
+        # copy mutable selection values too, so e.g. `lines.sort()` does not change the next evaluation
+        for name, value in self._selection_layer.items():
+            if isinstance(value, (list, dict, set)) and namespace.get(name) is value:
+                namespace[name] = value.copy()
+        return namespace
+
+    def _create_selection_layer(self, text: str) -> dotdict:
         ctx = dotdict()
         ctx.raw = ctx.text = ctx.s = ctx.txt = text
         ctx.lines = text.split("\n")
@@ -152,8 +226,7 @@ class PythonEvalPlugin(PluginInterface):
             auto = text
 
         ctx._ = ctx.auto = auto
-
-        self.eval_context.update(ctx)
+        return ctx
 
     def update_completions(self, command: str, cursor_pos: int) -> None:
         """Generate Python completions using rlcompleter and update via API."""
@@ -201,4 +274,16 @@ class PythonEvalPlugin(PluginInterface):
             self.api.hide_completion_popup()
 
     def register_settings(self, settings):
-        return super().register_settings(settings)  # TODO
+        section = settings.section("python_eval")
+        section.add(
+            "pipeline_cache_mb",
+            "Memory limit (MB) for caching pipeline stages (`lines | f | g`) while typing. 0 to disable",
+            64,
+            int,
+        )
+        section.add(
+            "helpers_file",
+            "Python file whose public names are available in the evaluator (reloaded when it changes)",
+            os.path.join(user_config_dir("F7"), "helpers.py"),
+            str,
+        )
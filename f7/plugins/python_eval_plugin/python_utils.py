@@ -10,6 +10,11 @@ import sys
 import tokenize as tokenize
 import types
 from contextlib import _RedirectStream
+from functools import lru_cache
+
+from scriptpy import transformers
+from scriptpy.smart_eval import balance_fix, smart_parse
+from scriptpy.TokenEditor import TokenEditor
 
 
 # general utils:
@@ -67,6 +72,56 @@ class PyUtils:
         return None
 
 
+# scriptpy
+@lru_cache(maxsize=256)
+def compile_scriptpy(src: str):
+    """
+    Compile scriptpy source the same way `scriptpy.custom_eval` does, but return
+    `(exec_code, eval_code)` instead of running it, so the code can be cached
+    and run in our own namespace (custom_eval copies the whole namespace on every call).
+    """
+    src = balance_fix(src)
+    toks = list(tokenize.generate_tokens(io.StringIO(src).readline))
+    editor = TokenEditor(toks)
+    for transformer in transformers:
+        transformer.token_level_transform(editor)
+        editor.commit()
+    editor.end()
+    rewritten = tokenize.untokenize(editor.as_token_list())
+
+    filename = "<main>"
+    tree = smart_parse(rewritten, filename=filename)
+    for transformer in transformers:
+        tree = transformer().visit(tree)
+    ast.fix_missing_locations(tree)
+
+    body = tree.body
+    if body and isinstance(body[-1], ast.Expr):
+        exec_code = None
+        if len(body) > 1:
+            exec_code = compile(ast.Module(body=body[:-1], type_ignores=[]), filename, "exec")
+        return exec_code, compile(ast.Expression(body[-1].value), filename, "eval")
+    return compile(tree, filename, "exec"), None
+
+
+def run_scriptpy(src: str, namespace: dict):
+    """Run scriptpy source in `namespace`, returning the value of the last expression (if any)."""
+    exec_code, eval_code = compile_scriptpy(src)
+    if exec_code is not None:
+        exec(exec_code, namespace)
+    if eval_code is not None:
+        return eval(eval_code, namespace)
+    return None
+
+
+def scriptpy_environment() -> dict:
+    """The helpers scriptpy code expects in its namespace (`_lpipe`, `_apipe`, `_shell_exec`, ...)."""
+    env = {}
+    for transformer in transformers:
+        env.update(transformer.environment)
+    return env
+
+
 def _run_if(f, text):
     ignorelist = [str, format, min, max]
     if f in ignorelist:
@@ -10,12 +10,25 @@ import re
 import string
 import sys
 from collections import Counter, defaultdict
-from datetime import date, datetime, timedelta
-from string import *
-from urllib.parse import quote, quote_plus, unquote, unquote_plus, urlparse, urlsplit
 from fnmatch import fnmatch
+from string import *
+
+from .lazy import lazy_attrs as _lazy_attrs
+
+# imported on first use (see lazy.py), so they do not slow down the tray startup.
+# (collections, hashlib and random are imported by F7 itself anyway)
+date, datetime, timedelta = _lazy_attrs("datetime", "date", "datetime", "timedelta")
+quote, quote_plus, unquote, unquote_plus, urlparse, urlsplit = _lazy_attrs(
+    "urllib.parse",
+    "quote",
+    "quote_plus",
+    "unquote",
+    "unquote_plus",
+    "urlparse",
+    "urlsplit",
+)
 
-from string_utils import (
+(
     asciify,
     booleanize,
     camel_case_to_snake,
@@ -31,6 +44,23 @@ from string_utils import (
     strip_margin,
     uuid,
     words_count,
+) = _lazy_attrs(
+    "string_utils",
+    "asciify",
+    "booleanize",
+    "camel_case_to_snake",
+    "prettify",
+    "random_string",
+    "reverse",
+    "roman_decode",
+    "roman_encode",
+    "secure_random_hex",
+    "shuffle",
+    "snake_case_to_camel",
+    "strip_html",
+    "strip_margin",
+    "uuid",
+    "words_count",
 )
 
 # simple shortcuts/longcuts
@@ -0,0 +1,69 @@
+import importlib.util
+import os
+import sys
+import traceback
+from typing import Optional
+
+"""
+load the user's helpers module (e.g. ~/.config/F7/helpers.py) into the eval context.
+the module is imported through importlib, so its bytecode is cached in __pycache__ like any other module.
+"""
+
+MODULE_NAME = "f7_user_helpers"
+
+
+class UserHelpers:
+    """
+    Tracks the user helpers file. `check()` is cheap (a single stat) and only marks the module as stale,
+    the import itself happens on first use, so it never slows down the tray startup.
+    """
+
+    def __init__(self):
+        self.path: Optional[str] = None
+        self.namespace: dict = {}
+        self.error: Optional[str] = None
+        self._loaded_mtime: Optional[float] = None
+        self._mtime: Optional[float] = None
+
+    def check(self, path: str) -> None:
+        """Re-read the file mtime. Called when the window is shown, not on every keystroke."""
+        self.path = os.path.expanduser(path) if path else None
+        try:
+            self._mtime = os.stat(self.path).st_mtime if self.path else None
+        except OSError:
+            self._mtime = None
+
+    @property
+    def stale(self) -> bool:
+        return self._mtime != self._loaded_mtime
+
+    def load(self) -> bool:
+        """(Re)import the module if it changed. Returns True if the namespace changed."""
+        if not self.stale:
+            return False
+        self._loaded_mtime = self._mtime
+        self.namespace = {}
+        self.error = None
+        sys.modules.pop(MODULE_NAME, None)
+        if self._mtime is None:
+            return True  # the file was removed
+
+        try:
+            spec = importlib.util.spec_from_file_location(MODULE_NAME, self.path)
+            if spec is None or spec.loader is None:
+                raise ImportError(f"Cannot import {self.path}")
+            module = importlib.util.module_from_spec(spec)
+            sys.modules[MODULE_NAME] = module  # needed for dataclasses, pickle, etc.
+            spec.loader.exec_module(module)
+        except Exception as e:
+            sys.modules.pop(MODULE_NAME, None)
+            self.error = f"{os.path.basename(self.path or '')}: {e}"
+            print(f"Python Evaluator: Error loading helpers {self.path}:", file=sys.stderr)
+            traceback.print_exc()
+            return True
+
+        names = getattr(module, "__all__", None) or [
+            name for name in vars(module) if not name.startswith("_")
+        ]
+        self.namespace = {name: getattr(module, name) for name in names}
+        return True
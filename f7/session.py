@@ -0,0 +1,88 @@
+# session.py
+import sys
+import zlib
+from typing import Optional
+
+
+class SelectionSession:
+    """
+    In-process stack of working selections, used to chain transformations
+    without going through the OS clipboard.
+
+    Entries larger than `compress_threshold` bytes are stored zlib-compressed.
+    The oldest entries are dropped to keep the stack under `max_bytes`
+    (the current entry is always kept).
+    """
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024, compress_threshold: int = 64 * 1024):
+        self.max_bytes = max_bytes
+        self.compress_threshold = compress_threshold
+        # (is_compressed, data, stored_size)
+        self._entries: list[tuple[bool, str | bytes, int]] = []
+        self._index = -1
+        self._size = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def position(self) -> int:
+        """1-based position of the current entry (0 when the session is empty)."""
+        return self._index + 1
+
+    def _pack(self, text: str) -> tuple[bool, str | bytes, int]:
+        if len(text) >= self.compress_threshold:
+            data = zlib.compress(text.encode("utf-8", "surrogatepass"), 1)
+            return True, data, len(data)
+        return False, text, sys.getsizeof(text)
+
+    @staticmethod
+    def _unpack(entry: tuple[bool, str | bytes, int]) -> str:
+        compressed, data, _ = entry
+        if compressed:
+            return zlib.decompress(data).decode("utf-8", "surrogatepass")  # type: ignore
+        return data  # type: ignore
+
+    def reset(self, text: str) -> None:
+        """Start a new session with the OS selection as its first entry."""
+        self.clear()
+        self.push(text)
+
+    def clear(self) -> None:
+        self._entries = []
+        self._index = -1
+        self._size = 0
+
+    def push(self, text: str) -> None:
+        """Make `text` the current entry. Entries after the current one (after stepping back) are discarded."""
+        for entry in self._entries[self._index + 1 :]:
+            self._size -= entry[2]
+        del self._entries[self._index + 1 :]
+
+        entry = self._pack(text)
+        self._entries.append(entry)
+        self._size += entry[2]
+        self._index = len(self._entries) - 1
+
+        while self._size > self.max_bytes and len(self._entries) > 1:
+            self._size -= self._entries.pop(0)[2]
+            self._index -= 1
+
+    def current(self) -> Optional[str]:
+        if self._index < 0:
+            return None
+        return self._unpack(self._entries[self._index])
+
+    def back(self) -> Optional[str]:
+        """Step to the previous entry. Returns None if there is nothing before the current one."""
+        if self._index <= 0:
+            return None
+        self._index -= 1
+        return self.current()
+
+    def forward(self) -> Optional[str]:
+        """Step to the next entry. Returns None if the current entry is the last one."""
+        if self._index >= len(self._entries) - 1:
+            return None
+        self._index += 1
+        return self.current()
@@ -26,7 +26,6 @@ from .plugins.base_plugin import PluginInterface
 from .settingsUI import SettingsDialog
 from .singleInstance import singleInstance
 from .ui import UIFactory
-from .utils import WORD_BOUNDARY_RE
 
 
 class F7Window(singleInstance):
@@ -59,11 +58,14 @@ class F7Window(singleInstance):
         self.core.load_settings_from_file()
         # 4. Initialize command history
         self.core.init_history()
+        # 5. Let plugins start background work (e.g. preloading models)
+        self.core.notify_startup()
 
         # --- Window State ---
         self.selected_text: str = ""  # Stores currently OS-selected text
         self.active_plugin: PluginInterface | None = None  # Currently active plugin
         self.do_not_trigger_AC_flag = False  # Prevents autocomplete re-triggering
+        self._chain_pending = False  # Next result becomes the working selection (Shift+Enter)
         self._focus_changed_connection = (
             None  # Manages focus change connection for closeOnBlur
         )
@@ -169,6 +171,7 @@ class F7Window(singleInstance):
     def _update_selected_text_and_status(self):
         """Helper to get selected text and update status."""
         self.selected_text = self.core.get_os_selected_text()
+        self.core.start_session(self.selected_text)
         self.update_status_bar(
             self.active_plugin or self.core.find_plugin(is_default=True)
         )
@@ -190,7 +193,9 @@ class F7Window(singleInstance):
             else "Ready"
         )
         char_count = len(self.selected_text)
-        self.status_bar.setText(f"✂️ ({char_count} chars) | {status_message}")
+        session = self.core.session
+        step = f" [{session.position}/{len(session)}]" if len(session) > 1 else ""
+        self.status_bar.setText(f"✂️ ({char_count} chars){step} | {status_message}")
 
     def _reload_visual_settings(self):
         """
@@ -274,7 +279,7 @@ class F7Window(singleInstance):
             self.completion_model.setStringList([])  # Clear old completions
             if self.completer:
                 self.completer.popup().hide()  # Hide popup
-            self.active_plugin = new_active_plugin
+            self._set_active_plugin(new_active_plugin)
 
         if not self.active_plugin:
             self.status_bar.setText("No matching plugin found!")
@@ -338,9 +343,9 @@ class F7Window(singleInstance):
             ):  # Popup is visible, but not explicitly triggered now
                 # Update prefix for filtering if user is typing with popup open
                 text_before_cursor = command[:cursor_pos]
-                match = WORD_BOUNDARY_RE.search(
+                match = self.active_plugin.COMPLETION_WORD_RE.search(
                     text_before_cursor
-                )  # Use regex from utils
+                )
                 if match:
                     prefix = match.group(1)
                     self.completer.setCompletionPrefix(prefix)
@@ -484,9 +489,8 @@ class F7Window(singleInstance):
             if not is_completer_visible:
                 if key in [Qt.Key.Key_Return, Qt.Key.Key_Enter]:
                     if modifiers == Qt.KeyboardModifier.ShiftModifier:
-                        # QLineEdit doesn't directly support multiline, this might be for future
-                        # For now, Shift+Enter could be an alternative execute or do nothing
-                        pass  # Or self._execute_command(alternative_mode=True)
+                        # Shift+Enter: the result becomes the new working selection
+                        self._execute_command(chain=True)
                     elif (
                         modifiers == Qt.KeyboardModifier.ControlModifier
                     ):  # Ctrl+Enter for manual preview
@@ -503,7 +507,18 @@ class F7Window(singleInstance):
                     return True
 
                 elif key == Qt.Key.Key_Escape:
-                    self.close_window()
+                    # Escape first cancels a running execution, then closes the window
+                    if not (self.active_plugin and self.active_plugin.cancel()):
+                        self.close_window()
+                    event.accept()
+                    return True
+
+                # --- Session stepping (Alt+Left/Alt+Right) ---
+                elif modifiers == Qt.KeyboardModifier.AltModifier and key in [
+                    Qt.Key.Key_Left,
+                    Qt.Key.Key_Right,
+                ]:
+                    self._step_session(forward=key == Qt.Key.Key_Right)
                     event.accept()
                     return True
 
@@ -557,10 +572,14 @@ class F7Window(singleInstance):
         self.preview_output.hide()
         QTimer.singleShot(0, self.adjustSize)  # Adjust main window size after hiding
 
-    def _execute_command(self):
+    def _execute_command(self, chain: bool = False):
         """
         Executes the current command using the active plugin.
         Adds command to history and handles results (e.g., copying to clipboard).
+
+        Args:
+            chain (bool): If True, the result becomes the new working selection
+                          instead of being copied to the clipboard.
         """
         command_raw = self.input_field.text()
 
@@ -568,6 +587,8 @@ class F7Window(singleInstance):
             self.status_bar.setText("No plugin active to execute command.")
             return
 
+        self._chain_pending = chain
+
         # Add to history before execution
         self.core.add_to_history(command_raw)
 
@@ -618,6 +639,9 @@ class F7Window(singleInstance):
 
     def _copy_to_clipboard_and_close(self, result_text: str):
         """Copies the given text to clipboard and closes the window."""
+        if self._chain_pending:
+            self._push_session_result(result_text)
+            return
         clipboard = QGuiApplication.clipboard()
         if clipboard:
             clipboard.setText(str(result_text))  # Ensure it's a string
@@ -630,6 +654,26 @@ class F7Window(singleInstance):
         else:
             self.status_bar.setText("INTERNAL Error: Could not access clipboard.")
 
+    def _push_session_result(self, result_text: str):
+        """
+        Makes the result the new working selection (in-process, no clipboard round-trip)
+        and clears the input for the next transformation.
+        """
+        self._chain_pending = False
+        result_text = str(result_text)
+        self.core.session.push(result_text)
+        self.selected_text = result_text
+        self.input_field.clear()  # triggers _handle_input_change, which resets the preview
+        self.update_status_bar(self.active_plugin)
+
+    def _step_session(self, forward: bool):
+        """Steps back/forward between the chained results and re-runs the preview."""
+        text = self.core.session.forward() if forward else self.core.session.back()
+        if text is None:
+            return
+        self.selected_text = text
+        self._handle_input_change()
+
     def _on_focus_changed(self, old_widget: QWidget | None, new_widget: QWidget | None):
         """
         Handles application focus changes. If 'closeOnBlur' is enabled,
@@ -670,13 +714,25 @@ class F7Window(singleInstance):
         self.preview_output.clear()
         self._hide_preview_output()
         self.selected_text = ""  # Clear captured OS selection
-        self.active_plugin = self.core.find_plugin(
-            is_default=True
+        self.core.session.clear()
+        self._chain_pending = False
+        self._set_active_plugin(
+            self.core.find_plugin(is_default=True)
         )  # Reset to default plugin
         self.update_status_bar(self.active_plugin)
         self.core.reset_history_index_to_latest()
         self._adjust_main_window_height()  # Recalculate height for clean state
 
+    def _set_active_plugin(self, plugin):
+        """Switch the active plugin, letting the previous one stop its preview work."""
+        previous = self.active_plugin
+        self.active_plugin = plugin
+        if previous is not None and previous is not plugin:
+            try:
+                previous.on_deactivate()
+            except Exception as e:
+                print(f"Window: Error deactivating plugin '{previous.NAME}': {e}", file=sys.stderr)
+
     def quit_application(self):
         """Initiates the application quit sequence."""
         # Cleanup is handled by _handle_application_quit via app.aboutToQuit signal
@@ -760,6 +816,8 @@ class F7Window(singleInstance):
             self._capture_initial_os_selection()  # Get current OS selected text
         except KeyboardInterrupt:
             print("you are likely running F7 from the terminal. to copy on windows/macOS it does ctrl+c. Unfortunately, its the same shortcut to quit in the terminal. ")
+
+        self.core.notify_window_shown()
         
         if sys.platform == "win32":
             self.move_to_current_monitor()